@@ -0,0 +1,399 @@
+import json
+import sqlite3
+import threading
+from bisect import bisect_right
+from contextlib import contextmanager
+from itertools import accumulate, islice
+from typing import NamedTuple
+
+# Bücher werden nach ihrer laufenden Nummer (seq) in Blöcke zu je 2**CHUNK_BITS aufgeteilt (siehe ChunkedMap):
+CHUNK_BITS = 10
+# Die Schlüssel eines Index werden über hash(Schlüssel) auf so viele Teile verteilt (siehe Index):
+INDEX_SHARDS = 1024
+INDEXES = ("by_title", "by_author", "by_category", "by_author_and_category")
+
+
+def normalize(value) -> str:
+    """Vergleichsschlüssel: Groß-/Kleinschreibung spielt keine Rolle."""
+    return str(value).casefold()
+
+
+class ChunkedMap:
+    """Unveränderliche Abbildung seq -> Buch, aufgeteilt in Blöcke fortlaufender Nummern.
+
+    Wie `ChunkedMap` in Grundlegende_FastAPI_Konzepte/book_store.py: `set`/`remove` liefern eine
+    neue ChunkedMap und kopieren nur den betroffenen Block und die Blockliste. `values()` und
+    `at(position)` zählen in seq-Reihenfolge, also in Einfügereihenfolge.
+    """
+
+    __slots__ = ("_chunks", "_size", "_order")
+
+    def __init__(self, chunks: dict | None = None, size: int = 0):
+        self._chunks = chunks or {}
+        self._size = size
+        # Sortierte Blocknummern und Startposition jedes Blocks, erst beim ersten Lesen berechnet:
+        self._order = None
+
+    @classmethod
+    def from_items(cls, items) -> "ChunkedMap":
+        chunks = {}
+        for seq, book in items:
+            chunks.setdefault(seq >> CHUNK_BITS, {})[seq] = book
+        return cls(chunks, sum(len(chunk) for chunk in chunks.values()))
+
+    def get(self, seq: int):
+        chunk = self._chunks.get(seq >> CHUNK_BITS)
+        return None if chunk is None else chunk.get(seq)
+
+    def first(self) -> tuple | None:
+        """(seq, Buch) mit der kleinsten seq oder None."""
+        return next(iter(self._chunks[min(self._chunks)].items())) if self._chunks else None
+
+    def seqs(self) -> list:
+        return [seq for key in self._ordered()[0] for seq in self._chunks[key]]
+
+    def values(self) -> list:
+        return [book for key in self._ordered()[0] for book in self._chunks[key].values()]
+
+    def at(self, position: int):
+        """Buch an `position` (negativ zählt von hinten, wie bei Listen)."""
+        if position < 0:
+            position += self._size
+        if not 0 <= position < self._size:
+            raise IndexError("book index out of range")
+        keys, starts = self._ordered()
+        index = bisect_right(starts, position) - 1
+        return next(islice(self._chunks[keys[index]].values(), position - starts[index], None))
+
+    def set(self, seq: int, book) -> "ChunkedMap":
+        key = seq >> CHUNK_BITS
+        chunk = dict(self._chunks.get(key, {}))
+        size = self._size + (seq not in chunk)
+        # Blöcke bleiben nach seq sortiert; nur eine kleinere neue seq (z.B. bei update) erfordert Sortieren:
+        reorder = seq not in chunk and chunk and seq < next(reversed(chunk))
+        chunk[seq] = book
+        if reorder:
+            chunk = dict(sorted(chunk.items()))
+        return ChunkedMap({**self._chunks, key: chunk}, size)
+
+    def remove(self, seq: int) -> "ChunkedMap":
+        key = seq >> CHUNK_BITS
+        chunk = dict(self._chunks[key])
+        del chunk[seq]
+        chunks = dict(self._chunks)
+        if chunk:
+            chunks[key] = chunk
+        else:
+            del chunks[key]
+        return ChunkedMap(chunks, self._size - 1)
+
+    def _ordered(self) -> tuple[list, list]:
+        if self._order is None:
+            keys = sorted(self._chunks)
+            self._order = keys, list(accumulate((len(self._chunks[key]) for key in keys), initial=0))
+        return self._order
+
+    def __len__(self):
+        return self._size
+
+
+EMPTY = ChunkedMap()
+
+
+class Index:
+    """Unveränderliche Abbildung Schlüssel -> ChunkedMap der Bücher mit diesem Schlüssel.
+
+    Die Schlüssel sind über hash(Schlüssel) auf INDEX_SHARDS Teile verteilt; `add`/`discard`
+    kopieren nur den Teil des Schlüssels und dessen ChunkedMap-Block statt aller Schlüssel
+    (`by_title` hat etwa einen pro Buch, `by_category` sehr große Einträge).
+    """
+
+    __slots__ = ("_shards",)
+
+    def __init__(self, shards: dict | None = None):
+        self._shards = shards or {}
+
+    @classmethod
+    def from_buckets(cls, buckets: dict) -> "Index":
+        shards = {}
+        for key, items in buckets.items():
+            shards.setdefault(hash(key) % INDEX_SHARDS, {})[key] = ChunkedMap.from_items(items)
+        return cls(shards)
+
+    def get(self, key) -> ChunkedMap | None:
+        shard = self._shards.get(hash(key) % INDEX_SHARDS)
+        return None if shard is None else shard.get(key)
+
+    def add(self, key, seq: int, book) -> "Index":
+        number = hash(key) % INDEX_SHARDS
+        shard = dict(self._shards.get(number, {}))
+        shard[key] = shard.get(key, EMPTY).set(seq, book)
+        return Index({**self._shards, number: shard})
+
+    def discard(self, key, seq: int) -> "Index":
+        number = hash(key) % INDEX_SHARDS
+        shard = dict(self._shards[number])
+        bucket = shard[key].remove(seq)
+        if len(bucket):
+            shard[key] = bucket
+        else:
+            del shard[key]
+        shards = dict(self._shards)
+        if shard:
+            shards[number] = shard
+        else:
+            del shards[number]
+        return Index(shards)
+
+
+class Snapshot(NamedTuple):
+    """Unveränderlicher Stand des Speichers; wird nach der Veröffentlichung nie mehr geändert."""
+    version: int
+    books: ChunkedMap
+    by_title: Index
+    by_author: Index
+    by_category: Index
+    by_author_and_category: Index
+    next_seq: int
+
+
+class BookStore:
+    """Bücher (dicts) mit vorab normalisierten Indizes statt `.casefold()` in jeder Anfrage.
+
+    Jedes Buch bekommt beim Einfügen eine laufende Nummer (seq). Die Schlüssel werden einmal
+    beim Schreiben gebildet:
+    - `by_title`, `by_author`, `by_category`: casefold(Wert) -> Bücher
+    - `by_author_and_category`: (casefold(author), casefold(category)) -> Bücher
+
+    `books` (seq -> Buch) liefert auch den Zugriff über die Position (/books/id/).
+
+    Leser arbeiten ohne Sperre auf dem aktuellen `Snapshot`; Schreiber bauen unter einer
+    Sperre einen neuen (copy-on-write, nur die betroffenen Blöcke, siehe ChunkedMap und Index)
+    und tauschen ihn mit einer Zuweisung aus. Mit `backing` (siehe `SQLiteBacking`) sehen alle
+    uvicorn-Worker dieselben Bücher.
+    """
+
+    def __init__(self, books=(), backing=None):
+        self._lock = threading.Lock()
+        self._backing = backing
+        if backing is None:
+            self._snapshot = build_snapshot(0, enumerate(books, 1))
+        else:
+            backing.seed(books)
+            self._snapshot = build_snapshot(*backing.load())
+
+    def snapshot(self) -> Snapshot:
+        snapshot = self._snapshot
+        if self._backing is not None and self._backing.version() != snapshot.version:
+            with self._lock:
+                snapshot = self._refresh()
+        return snapshot
+
+    def at(self, index: int):
+        return self.snapshot().books.at(index)
+
+    def all(self) -> list:
+        return self.snapshot().books.values()
+
+    def find_title(self, title: str):
+        """Erstes Buch mit diesem Titel oder None."""
+        books = self.snapshot().by_title.get(normalize(title))
+        return books.first()[1] if books is not None else None
+
+    def by_author(self, author: str) -> list:
+        return _values(self.snapshot().by_author.get(normalize(author)))
+
+    def by_category(self, category: str) -> list:
+        return _values(self.snapshot().by_category.get(normalize(category)))
+
+    def by_author_and_category(self, author: str, category: str) -> list:
+        return _values(self.snapshot().by_author_and_category.get((normalize(author), normalize(category))))
+
+    def add(self, book):
+        with self._lock:
+            snapshot = self._refresh()
+            if self._backing is not None:
+                version, seq = self._backing.insert(book)
+            else:
+                version, seq = snapshot.version + 1, snapshot.next_seq
+            if not self._reload_if_behind(snapshot, version):
+                self._snapshot = _index(snapshot, seq, book)._replace(
+                    version=version, books=snapshot.books.set(seq, book), next_seq=max(snapshot.next_seq, seq + 1)
+                )
+        return book
+
+    def update(self, book) -> int:
+        """Ersetzt alle Bücher mit gleichem Titel (an ihrer Position); gibt die Anzahl zurück."""
+        title = normalize(book.get("title", ""))
+        with self._lock:
+            snapshot = self._refresh()
+            old_books = snapshot.by_title.get(title)
+            seqs = old_books.seqs() if old_books is not None else []
+            if self._backing is not None:
+                version, count = self._backing.update(title, book)
+            else:
+                version, count = snapshot.version + 1, len(seqs)
+            if not count or self._reload_if_behind(snapshot, version):
+                return count
+            for seq in seqs:
+                # books.set ersetzt an derselben Position, nur die Indizes werden umgehängt:
+                snapshot = _index(_unindex(snapshot, seq, snapshot.books.get(seq)), seq, book)
+                snapshot = snapshot._replace(books=snapshot.books.set(seq, book))
+            self._snapshot = snapshot._replace(version=version)
+        return count
+
+    def delete(self, title: str) -> bool:
+        """Entfernt das erste Buch mit diesem Titel."""
+        title = normalize(title)
+        with self._lock:
+            snapshot = self._refresh()
+            old_books = snapshot.by_title.get(title)
+            if self._backing is not None:
+                version = self._backing.delete(title)
+            else:
+                version = snapshot.version + 1 if old_books is not None else None
+            if version is None or self._reload_if_behind(snapshot, version):
+                return version is not None
+            seq, book = old_books.first()
+            self._snapshot = _unindex(snapshot, seq, book)._replace(version=version, books=snapshot.books.remove(seq))
+        return True
+
+    def __len__(self):
+        return len(self.snapshot().books)
+
+    def _refresh(self) -> Snapshot:
+        """Aktueller Snapshot, bei geänderter Datenbank neu geladen (nur unter der Sperre aufrufen)."""
+        snapshot = self._snapshot
+        if self._backing is not None and self._backing.version() != snapshot.version:
+            snapshot = self._snapshot = build_snapshot(*self._backing.load())
+        return snapshot
+
+    def _reload_if_behind(self, snapshot: Snapshot, version: int) -> bool:
+        # Hat ein anderer Worker dazwischen geschrieben, wird vollständig neu geladen:
+        if version == snapshot.version + 1:
+            return False
+        self._snapshot = build_snapshot(*self._backing.load())
+        return True
+
+
+def build_snapshot(version: int, items) -> Snapshot:
+    """Baut alle Indizes auf einmal auf (Start und Neuladen); `items` sind (seq, Buch)-Paare."""
+    items = list(items)
+    buckets = {name: {} for name in INDEXES}
+    for seq, book in items:
+        for name, key in _keys(book):
+            buckets[name].setdefault(key, []).append((seq, book))
+    indexes = {name: Index.from_buckets(buckets[name]) for name in INDEXES}
+    next_seq = max((seq for seq, _ in items), default=0) + 1
+    return Snapshot(version, ChunkedMap.from_items(items), next_seq=next_seq, **indexes)
+
+
+def _keys(book) -> tuple:
+    author = normalize(book.get("author", ""))
+    category = normalize(book.get("category", ""))
+    return (
+        ("by_title", normalize(book.get("title", ""))),
+        ("by_author", author),
+        ("by_category", category),
+        ("by_author_and_category", (author, category)),
+    )
+
+
+# Ein veröffentlichter Snapshot wird nicht verändert, sondern über _replace neu gebildet
+# (nur die Indizes; `books` ändern die Aufrufer):
+def _index(snapshot: Snapshot, seq: int, book) -> Snapshot:
+    return snapshot._replace(**{name: getattr(snapshot, name).add(key, seq, book) for name, key in _keys(book)})
+
+
+def _unindex(snapshot: Snapshot, seq: int, book) -> Snapshot:
+    return snapshot._replace(**{name: getattr(snapshot, name).discard(key, seq) for name, key in _keys(book)})
+
+
+def _values(books: ChunkedMap | None) -> list:
+    return books.values() if books is not None else []
+
+
+class SQLiteBacking:
+    """Gemeinsame SQLite-Datei für alle uvicorn-Worker (Bücher als JSON, in Einfügereihenfolge).
+
+    Jeder Schreibzugriff erhöht `meta.version` in derselben Transaktion; ein Worker erkennt
+    daran mit einer kleinen Abfrage, ob sein Snapshot veraltet ist. Die Spalte `seq` ist die
+    laufende Nummer der Bücher im `BookStore`.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute("CREATE TABLE IF NOT EXISTS books (seq INTEGER PRIMARY KEY AUTOINCREMENT, title_key TEXT, doc TEXT)")
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_books_title_key ON books (title_key, seq)")
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER)")
+        conn.execute("INSERT OR IGNORE INTO meta VALUES (1, 0)")
+
+    def _connection(self) -> sqlite3.Connection:
+        # Eine Verbindung pro Thread; WAL, damit Leser die Schreiber nicht blockieren:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def version(self) -> int:
+        return self._connection().execute("SELECT version FROM meta").fetchone()[0]
+
+    def load(self) -> tuple[int, list]:
+        conn = self._connection()
+        conn.execute("BEGIN")
+        try:
+            version = conn.execute("SELECT version FROM meta").fetchone()[0]
+            rows = conn.execute("SELECT seq, doc FROM books ORDER BY seq").fetchall()
+        finally:
+            conn.execute("COMMIT")
+        return version, [(seq, json.loads(doc)) for seq, doc in rows]
+
+    def seed(self, books):
+        """Legt die Startdaten an, falls die Datenbank noch leer ist (nur der erste Worker)."""
+        with self._write() as conn:
+            if conn.execute("SELECT 1 FROM books LIMIT 1").fetchone() is None:
+                conn.executemany("INSERT INTO books (title_key, doc) VALUES (?, ?)", map(_row, books))
+                self._bump(conn)
+
+    def insert(self, book) -> tuple[int, int]:
+        """Fügt ein Buch ein; gibt die neue Version und die seq des Buchs zurück."""
+        with self._write() as conn:
+            cursor = conn.execute("INSERT INTO books (title_key, doc) VALUES (?, ?)", _row(book))
+            return self._bump(conn), cursor.lastrowid
+
+    def update(self, title_key: str, book) -> tuple[int, int]:
+        with self._write() as conn:
+            cursor = conn.execute("UPDATE books SET doc = ? WHERE title_key = ?", (json.dumps(book), title_key))
+            return (self._bump(conn) if cursor.rowcount else None), cursor.rowcount
+
+    def delete(self, title_key: str) -> int | None:
+        with self._write() as conn:
+            cursor = conn.execute(
+                "DELETE FROM books WHERE seq = (SELECT min(seq) FROM books WHERE title_key = ?)", (title_key,)
+            )
+            return self._bump(conn) if cursor.rowcount else None
+
+    @contextmanager
+    def _write(self):
+        # BEGIN IMMEDIATE: Schreibzugriffe verschiedener Worker laufen nacheinander.
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    @staticmethod
+    def _bump(conn) -> int:
+        conn.execute("UPDATE meta SET version = version + 1")
+        return conn.execute("SELECT version FROM meta").fetchone()[0]
+
+
+def _row(book) -> tuple:
+    return normalize(book.get("title", "")), json.dumps(book)
@@ -0,0 +1,275 @@
+"""Benchmarks für die Bücher-App.
+
+Aufruf aus diesem Verzeichnis, z.B.:
+    python benchmark.py store --books 1000000
+    python benchmark.py memory --books 1000000
+    python benchmark.py serialize --books 100000
+    python benchmark.py concurrency --books 100000 --readers 4 --writers 1
+    python benchmark.py search --books 1000000
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse
+
+from book_store import BookStore, SQLiteBacking
+from books import Book
+from search_index import SearchIndex
+
+
+class LegacyBook():
+    """Bisherige Book-Klasse aus books.py (mit __dict__ pro Instanz) zum Vergleich."""
+
+    def __init__(self, id, title, author, description, rating, published_date):
+        self.id = id
+        self.title = title
+        self.author = author
+        self.description = description
+        self.rating = rating
+        self.published_date = published_date
+
+
+def make_books(count: int, seed: int = 42, book_class=Book) -> list:
+    """Erzeugt `count` Testbücher mit zufälligem Rating (1-5) und Jahr (2000-2030)."""
+    rng = random.Random(seed)
+    return [
+        book_class(i, f"Title {i}", f"Author {i % 1000}", "Book Description", rng.randint(1, 5), rng.randint(2000, 2030))
+        for i in range(1, count + 1)
+    ]
+
+
+def timed(func, repeat: int) -> float:
+    """Mittlere Laufzeit eines Aufrufs in Millisekunden."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+# Bisheriges Vorgehen aus books.py: lineare Suche über die Liste.
+def list_get(books: list, book_id: int):
+    for book in books:
+        if book.id == book_id:
+            return book
+
+
+def list_by_rating(books: list, rating: int) -> list:
+    return [book for book in books if book.rating == rating]
+
+
+def list_by_published_date(books: list, published_date: int) -> list:
+    return [book for book in books if book.published_date == published_date]
+
+
+def list_update(books: list, new_book) -> bool:
+    for i in range(len(books)):
+        if books[i].id == new_book.id:
+            books[i] = new_book
+            return True
+    return False
+
+
+def list_delete(books: list, book_id: int) -> bool:
+    for i in range(len(books)):
+        if books[i].id == book_id:
+            books.pop(i)
+            return True
+    return False
+
+
+def bench_store(args):
+    books = make_books(args.books)
+    start = time.perf_counter()
+    store = BookStore(books)
+    print(f"BookStore aufgebaut: {len(store)} Bücher in {time.perf_counter() - start:.2f}s")
+
+    rng = random.Random(1)
+    ids = [rng.randint(1, args.books) for _ in range(args.repeat)]
+    pick = iter(ids * 2)
+    updated = lambda: Book(next(pick), "Changed", "Author", "Book Description", 4, 2020)
+
+    cases = [
+        ("get(id)", lambda: list_get(books, ids[-1]), lambda: store.get(ids[-1])),
+        ("by_rating", lambda: list_by_rating(books, 3), lambda: store.by_rating(3)),
+        ("by_published_date", lambda: list_by_published_date(books, 2015), lambda: store.by_published_date(2015)),
+        ("update", lambda: list_update(books, updated()), lambda: store.update(updated())),
+    ]
+    print(f"{'Operation':<20}{'Liste (ms)':>14}{'BookStore (ms)':>16}{'Faktor':>10}")
+    for name, linear, indexed in cases:
+        linear_ms = timed(linear, args.repeat)
+        indexed_ms = timed(indexed, args.repeat)
+        print(f"{name:<20}{linear_ms:>14.3f}{indexed_ms:>16.4f}{linear_ms / max(indexed_ms, 1e-9):>10.0f}x")
+
+    # Löschen: in der Liste O(n) (Suche + pop), im BookStore O(1) inkl. Indexpflege.
+    delete_ids = rng.sample(range(1, args.books + 1), args.repeat)
+    linear_ids, indexed_ids = iter(delete_ids), iter(delete_ids)
+    linear_ms = timed(lambda: list_delete(books, next(linear_ids)), args.repeat)
+    indexed_ms = timed(lambda: store.delete(next(indexed_ids)), args.repeat)
+    print(f"{'delete':<20}{linear_ms:>14.3f}{indexed_ms:>16.4f}{linear_ms / max(indexed_ms, 1e-9):>10.0f}x")
+
+
+def bench_memory(args):
+    print(f"{'Klasse':<12}{'Bytes/Buch':>12}{'gesamt (MB)':>14}")
+    for name, book_class in (("LegacyBook", LegacyBook), ("Book", Book)):
+        gc.collect()
+        tracemalloc.start()
+        books = make_books(args.books, book_class=book_class)
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{name:<12}{size / len(books):>12.0f}{size / 1e6:>14.1f}")
+        del books
+
+
+def bench_serialize(args):
+    """Bisheriger Weg von FastAPI (jsonable_encoder + json.dumps) vs. orjson direkt auf den Büchern."""
+    legacy_books = make_books(args.books, book_class=LegacyBook)
+    books = make_books(args.books)
+
+    def legacy():
+        return json.dumps(jsonable_encoder(legacy_books), ensure_ascii=False, separators=(",", ":")).encode()
+
+    def orjson_direct():
+        return ORJSONResponse(books).body
+
+    assert json.loads(legacy()) == json.loads(orjson_direct())
+    print(f"{'Variante':<22}{'ms':>10}{'Bücher/s':>14}")
+    for name, func in (("jsonable_encoder+json", legacy), ("orjson (slots)", orjson_direct)):
+        elapsed_ms = timed(func, args.repeat)
+        print(f"{name:<22}{elapsed_ms:>10.1f}{args.books / elapsed_ms * 1000:>14.0f}")
+
+
+def run_concurrent(store: BookStore, books: int, readers: int, writers: int, duration: float) -> dict:
+    """Leser (get) und Schreiber (update) laufen gleichzeitig in Threads."""
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+    stop = threading.Event()
+
+    def reader(seed: int):
+        rng = random.Random(seed)
+        done = 0
+        while not stop.is_set():
+            if store.get(rng.randint(1, books)) is None:
+                counts["errors"] += 1
+            done += 1
+        counts["reads"] += done
+
+    def writer(seed: int):
+        rng = random.Random(seed)
+        done = 0
+        while not stop.is_set():
+            book_id = rng.randint(1, books)
+            store.update(Book(book_id, f"Title {book_id}", "Author", "Book Description", rng.randint(1, 5), rng.randint(2000, 2030)))
+            done += 1
+        counts["writes"] += done
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    threads += [threading.Thread(target=writer, args=(1000 + i,)) for i in range(writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return {name: count / duration if name != "errors" else count for name, count in counts.items()}
+
+
+def bench_concurrency(args):
+    with tempfile.TemporaryDirectory() as workdir:
+        variants = [
+            ("Speicher (COW)", lambda: BookStore(make_books(args.books))),
+            ("SQLite-Backing", lambda: BookStore(make_books(args.books), backing=SQLiteBacking(os.path.join(workdir, "books.db"), Book))),
+        ]
+        print(f"{'Variante':<18}{'Lesen/s':>12}{'Schreiben/s':>14}{'Fehler':>8}")
+        for name, factory in variants:
+            result = run_concurrent(factory(), args.books, args.readers, args.writers, args.duration)
+            print(f"{name:<18}{result['reads']:>12.0f}{result['writes']:>14.0f}{result['errors']:>8}")
+
+
+def make_search_books(count: int, vocabulary: int, seed: int = 42) -> tuple[list, list]:
+    """Bücher mit zufälligen Wörtern aus einem Kunstwortschatz (realistischere Trefferlisten)."""
+    rng = random.Random(seed)
+    words = [f"{rng.choice('bcdfghklmnprst')}{rng.choice('aeiou')}{i:x}" for i in range(vocabulary)]
+    authors = [f"{rng.choice(words)} {rng.choice(words)}" for _ in range(vocabulary // 10)]
+    return [
+        Book(i, " ".join(rng.choices(words, k=3)), rng.choice(authors), " ".join(rng.choices(words, k=8)),
+             rng.randint(1, 5), rng.randint(2000, 2030))
+        for i in range(1, count + 1)
+    ], words
+
+
+def bench_search(args):
+    books, words = make_search_books(args.books, args.vocabulary)
+    start = time.perf_counter()
+    store = BookStore(books, search_index=SearchIndex())
+    print(f"Index aufgebaut: {len(store.search_index)} Bücher in {time.perf_counter() - start:.2f}s")
+
+    rng = random.Random(7)
+    queries = {
+        "1 Wort": [rng.choice(words) for _ in range(args.queries)],
+        "2 Wörter": [f"{rng.choice(words)} {rng.choice(words)}" for _ in range(args.queries)],
+        "Präfix": [rng.choice(words)[:4] for _ in range(args.queries)],
+        "Wort + Präfix": [f"{rng.choice(words)} {rng.choice(words)[:3]}" for _ in range(args.queries)],
+    }
+    print(f"{'Anfrage':<16}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'Treffer':>10}")
+    for name, texts in queries.items():
+        latencies, hits = [], 0
+        for text in texts:
+            start = time.perf_counter()
+            total, book_ids = store.search_index.search(text, limit=20)
+            [store.get(book_id) for book_id in book_ids]
+            latencies.append((time.perf_counter() - start) * 1000)
+            hits += total
+        latencies.sort()
+        p50, p95, p99 = (latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] for p in (50, 95, 99))
+        print(f"{name:<16}{p50:>10.3f}{p95:>10.3f}{p99:>10.3f}{hits / len(texts):>10.0f}")
+
+    # Inkrementelle Pflege: create/update/delete ohne Neuaufbau des Index.
+    new_ids = []
+    def create():
+        new_ids.append(store.add(Book(None, f"{rng.choice(words)} {rng.choice(words)}", "New Author", "New description", 3, 2024)).id)
+    def update():
+        store.update(Book(rng.randint(1, args.books), f"{rng.choice(words)} changed", "Author", "Changed description", 2, 2021))
+    for name, func in (("create", create), ("update", update), ("delete", lambda: store.delete(new_ids.pop()))):
+        print(f"{name:<16}{timed(func, args.queries):>10.3f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks für die Bücher-App")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    store = subparsers.add_parser("store", help="Lineare Suche in der Liste vs. BookStore mit Indizes")
+    store.add_argument("--books", type=int, default=1_000_000)
+    store.add_argument("--repeat", type=int, default=20)
+    store.set_defaults(func=bench_store)
+
+    memory = subparsers.add_parser("memory", help="Speicher pro Buch: bisherige Klasse vs. slots-Dataclass")
+    memory.add_argument("--books", type=int, default=1_000_000)
+    memory.set_defaults(func=bench_memory)
+
+    serialize = subparsers.add_parser("serialize", help="Serialisierung einer Bücherliste vorher/nachher")
+    serialize.add_argument("--books", type=int, default=100_000)
+    serialize.add_argument("--repeat", type=int, default=3)
+    serialize.set_defaults(func=bench_serialize)
+
+    concurrency = subparsers.add_parser("concurrency", help="Gleichzeitige Leser und Schreiber (copy-on-write, optional SQLite)")
+    concurrency.add_argument("--books", type=int, default=100_000)
+    concurrency.add_argument("--readers", type=int, default=4)
+    concurrency.add_argument("--writers", type=int, default=1)
+    concurrency.add_argument("--duration", type=float, default=5.0)
+    concurrency.set_defaults(func=bench_concurrency)
+
+    search = subparsers.add_parser("search", help="Volltextsuche über den invertierten Index")
+    search.add_argument("--books", type=int, default=1_000_000)
+    search.add_argument("--vocabulary", type=int, default=50_000, help="Anzahl unterschiedlicher Wörter")
+    search.add_argument("--queries", type=int, default=500)
+    search.set_defaults(func=bench_search)
+
+    args = parser.parse_args()
+    args.func(args)
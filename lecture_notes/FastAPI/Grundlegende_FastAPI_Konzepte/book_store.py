@@ -0,0 +1,383 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import NamedTuple
+
+COLUMNS = ("id", "title", "author", "description", "rating", "published_date")
+# So viele Versionen hält das Änderungsprotokoll; wer weiter zurückliegt, lädt alles neu:
+MAX_CHANGES = 10000
+
+
+# Bücher werden nach id in Blöcke zu je 2**CHUNK_BITS ids aufgeteilt (siehe ChunkedMap):
+CHUNK_BITS = 12
+
+
+class ChunkedMap:
+    """Unveränderliche Abbildung id -> Buch, aufgeteilt in Blöcke fortlaufender ids.
+
+    `set`/`remove` liefern eine neue ChunkedMap und kopieren dabei nur den betroffenen Block
+    (höchstens 4096 Einträge) und die Blockliste statt aller Bücher. `values()` liefert die
+    Bücher nach id sortiert (Blöcke in id-Reihenfolge).
+    """
+
+    __slots__ = ("_chunks", "_size")
+
+    def __init__(self, chunks: dict | None = None, size: int = 0):
+        self._chunks = chunks or {}
+        self._size = size
+
+    @classmethod
+    def from_books(cls, books) -> "ChunkedMap":
+        chunks = {}
+        for book in books:
+            chunks.setdefault(book.id >> CHUNK_BITS, {})[book.id] = book
+        return cls(chunks, sum(len(chunk) for chunk in chunks.values()))
+
+    def get(self, book_id: int):
+        chunk = self._chunks.get(book_id >> CHUNK_BITS)
+        return None if chunk is None else chunk.get(book_id)
+
+    def values(self) -> list:
+        return [book for key in sorted(self._chunks) for book in self._chunks[key].values()]
+
+    def set(self, book) -> "ChunkedMap":
+        key = book.id >> CHUNK_BITS
+        chunk = dict(self._chunks.get(key, {}))
+        size = self._size + (book.id not in chunk)
+        chunk[book.id] = book
+        return ChunkedMap({**self._chunks, key: chunk}, size)
+
+    def remove(self, book_id: int) -> "ChunkedMap":
+        key = book_id >> CHUNK_BITS
+        chunk = dict(self._chunks[key])
+        del chunk[book_id]
+        chunks = dict(self._chunks)
+        if chunk:
+            chunks[key] = chunk
+        else:
+            del chunks[key]
+        return ChunkedMap(chunks, self._size - 1)
+
+    def __len__(self):
+        return self._size
+
+
+EMPTY = ChunkedMap()
+
+
+class Snapshot(NamedTuple):
+    """Unveränderlicher Stand des Speichers; wird nach der Veröffentlichung nie mehr geändert."""
+    version: int
+    by_id: ChunkedMap
+    by_rating: dict
+    by_published_date: dict
+    next_id: int
+
+
+class BookStore:
+    """In-Memory-Speicher für Bücher mit Indizes statt linearer Suche.
+
+    - `by_id`: id -> Buch (O(1))
+    - `by_rating` / `by_published_date`: Wert -> ChunkedMap der Bücher (O(k) für k Treffer)
+
+    Leser holen sich ohne Sperre den aktuellen `Snapshot` (eine einzige Attribut-Zuweisung ist
+    atomar) und sehen so nie einen halb geänderten Stand, auch nicht in Threadpools.
+    Schreiber bauen unter einer Sperre einen neuen Snapshot (copy-on-write); dank `ChunkedMap`
+    werden dabei nur die betroffenen Blöcke kopiert.
+
+    Mit `backing` (siehe `SQLiteBacking`) teilen sich alle Worker-Prozesse dieselben Daten:
+    Schreibzugriffe gehen zuerst in die Datenbank, Leser übernehmen die Änderungen anderer
+    Worker, sobald sich dort die Version geändert hat. Dabei werden nur die geänderten Bücher
+    nachgeladen; alles neu geladen wird nur, wenn das Änderungsprotokoll die Lücke nicht mehr
+    abdeckt. Ein optionaler `search_index` (siehe `SearchIndex`) wird bei jeder Änderung
+    mitgepflegt.
+    """
+
+    def __init__(self, books=(), backing=None, search_index=None):
+        self._lock = threading.Lock()
+        self._backing = backing
+        self.search_index = search_index
+        if backing is None:
+            self._load(build_snapshot(0, books))
+        else:
+            backing.seed(books)
+            self._load(build_snapshot(*backing.load()))
+
+    def snapshot(self) -> Snapshot:
+        snapshot = self._snapshot
+        if self._backing is not None and self._backing.version() != snapshot.version:
+            with self._lock:
+                snapshot = self._refresh()
+        return snapshot
+
+    def next_id(self) -> int:
+        """Nächste freie id (unabhängig von der Reihenfolge der Bücher)."""
+        return self.snapshot().next_id
+
+    def add(self, book):
+        with self._lock:
+            snapshot = self._refresh()
+            if self._backing is not None:
+                version = self._backing.insert(book)
+            else:
+                if book.id is None:
+                    book.id = snapshot.next_id
+                version = snapshot.version + 1
+            self._publish(snapshot, version, snapshot.by_id.get(book.id), book)
+        return book
+
+    def get(self, book_id: int):
+        return self.snapshot().by_id.get(book_id)
+
+    def all(self) -> list:
+        return self.snapshot().by_id.values()
+
+    def by_rating(self, rating: int) -> list:
+        return self.snapshot().by_rating.get(rating, EMPTY).values()
+
+    def by_published_date(self, published_date: int) -> list:
+        return self.snapshot().by_published_date.get(published_date, EMPTY).values()
+
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> tuple[int, list]:
+        """Volltextsuche (siehe `SearchIndex`) auf dem aktuellen Stand, inklusive Änderungen anderer Worker.
+
+        Gibt die Gesamtzahl der Treffer und die Bücher der angefragten Seite zurück.
+        """
+        snapshot = self.snapshot()
+        total, book_ids = self.search_index.search(query, limit=limit, offset=offset)
+        return total, [book for book in map(snapshot.by_id.get, book_ids) if book is not None]
+
+    def update(self, book) -> bool:
+        # BookRequest.id ist optional; ohne id gibt es nichts zu ändern (-> 404 statt TypeError):
+        if book.id is None:
+            return False
+        with self._lock:
+            snapshot = self._refresh()
+            old_book = snapshot.by_id.get(book.id)
+            if self._backing is not None:
+                version = self._backing.update(book)
+            else:
+                version = None if old_book is None else snapshot.version + 1
+            if version is None:
+                return False
+            self._publish(snapshot, version, old_book, book)
+        return True
+
+    def delete(self, book_id: int) -> bool:
+        with self._lock:
+            snapshot = self._refresh()
+            old_book = snapshot.by_id.get(book_id)
+            if self._backing is not None:
+                version = self._backing.delete(book_id)
+            else:
+                version = None if old_book is None else snapshot.version + 1
+            if version is None:
+                return False
+            self._publish(snapshot, version, old_book, None)
+        return True
+
+    def __len__(self):
+        return len(self.snapshot().by_id)
+
+    def __iter__(self):
+        return iter(self.all())
+
+    def _refresh(self) -> Snapshot:
+        """Aktueller Snapshot inklusive Änderungen anderer Worker (nur unter der Sperre aufrufen)."""
+        snapshot = self._snapshot
+        if self._backing is not None and self._backing.version() != snapshot.version:
+            snapshot = self._catch_up(snapshot)
+        return snapshot
+
+    def _catch_up(self, snapshot: Snapshot) -> Snapshot:
+        """Übernimmt nur die seit `snapshot` geänderten Bücher, ohne Protokoll alles neu laden."""
+        changes = self._backing.changes_since(snapshot.version)
+        if changes is None:
+            return self._load(build_snapshot(*self._backing.load()))
+        version, books = changes
+        for book_id, book in books:
+            snapshot = self._apply(snapshot, version, snapshot.by_id.get(book_id), book)
+        self._snapshot = snapshot = snapshot._replace(version=version)
+        return snapshot
+
+    def _load(self, snapshot: Snapshot) -> Snapshot:
+        self._snapshot = snapshot
+        if self.search_index is not None:
+            self.search_index.rebuild(snapshot.by_id.values())
+        return snapshot
+
+    def _publish(self, snapshot: Snapshot, version: int, old_book, new_book):
+        if version != snapshot.version + 1:
+            # Ein anderer Prozess hat dazwischen geschrieben: dessen und unsere Änderung nachladen.
+            self._catch_up(snapshot)
+            return
+        self._snapshot = self._apply(snapshot, version, old_book, new_book)
+
+    def _apply(self, snapshot: Snapshot, version: int, old_book, new_book) -> Snapshot:
+        """Neuer Snapshot, in dem `old_book` durch `new_book` ersetzt ist (None = fehlt)."""
+        by_id = snapshot.by_id
+        by_rating = dict(snapshot.by_rating)
+        by_published_date = dict(snapshot.by_published_date)
+        if old_book is not None:
+            _remove(by_rating, old_book.rating, old_book.id)
+            _remove(by_published_date, old_book.published_date, old_book.id)
+            if new_book is None:
+                by_id = by_id.remove(old_book.id)
+        next_id = snapshot.next_id
+        if new_book is not None:
+            by_id = by_id.set(new_book)
+            by_rating[new_book.rating] = by_rating.get(new_book.rating, EMPTY).set(new_book)
+            by_published_date[new_book.published_date] = by_published_date.get(new_book.published_date, EMPTY).set(new_book)
+            next_id = max(next_id, new_book.id + 1)
+        if self.search_index is not None:
+            self.search_index.replace(old_book, new_book)
+        return Snapshot(version, by_id, by_rating, by_published_date, next_id)
+
+
+def build_snapshot(version: int, books) -> Snapshot:
+    """Baut alle Indizes auf einmal auf (Start und Neuladen, ohne Kopien pro Buch)."""
+    books = list(books)
+    next_id = 1
+    for book in books:
+        if book.id is None:
+            book.id = next_id
+        next_id = max(next_id, book.id + 1)
+    by_rating, by_published_date = {}, {}
+    for book in books:
+        by_rating.setdefault(book.rating, []).append(book)
+        by_published_date.setdefault(book.published_date, []).append(book)
+    return Snapshot(
+        version,
+        ChunkedMap.from_books(books),
+        {rating: ChunkedMap.from_books(group) for rating, group in by_rating.items()},
+        {date: ChunkedMap.from_books(group) for date, group in by_published_date.items()},
+        next_id,
+    )
+
+
+def _remove(index: dict, key, book_id: int):
+    books = index[key].remove(book_id)
+    if len(books):
+        index[key] = books
+    else:
+        del index[key]
+
+
+class SQLiteBacking:
+    """Gemeinsame SQLite-Datei für alle uvicorn-Worker.
+
+    Jeder Schreibzugriff erhöht `meta.version` in derselben Transaktion; ein Worker erkennt
+    daran mit einer kleinen Abfrage, ob sein Snapshot veraltet ist. Die Tabelle `changes`
+    protokolliert pro Version die geänderte id (die letzten MAX_CHANGES Versionen), damit ein
+    Worker nur diese Bücher nachladen muss. Neue ids vergibt SQLite, damit zwei Worker nicht
+    dieselbe id verwenden.
+    """
+
+    def __init__(self, path: str, factory):
+        self.path = path
+        self.factory = factory
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS books (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT, author TEXT,"
+            " description TEXT, rating INTEGER, published_date INTEGER)"
+        )
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER)")
+        conn.execute("INSERT OR IGNORE INTO meta VALUES (1, 0)")
+        conn.execute("CREATE TABLE IF NOT EXISTS changes (version INTEGER PRIMARY KEY, book_id INTEGER)")
+
+    def _connection(self) -> sqlite3.Connection:
+        # Eine Verbindung pro Thread; WAL, damit Leser die Schreiber nicht blockieren:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def version(self) -> int:
+        return self._connection().execute("SELECT version FROM meta").fetchone()[0]
+
+    def load(self) -> tuple[int, list]:
+        conn = self._connection()
+        conn.execute("BEGIN")
+        try:
+            version = conn.execute("SELECT version FROM meta").fetchone()[0]
+            rows = conn.execute(f"SELECT {', '.join(COLUMNS)} FROM books ORDER BY id").fetchall()
+        finally:
+            conn.execute("COMMIT")
+        return version, [self.factory(*row) for row in rows]
+
+    def changes_since(self, version: int) -> tuple[int, list] | None:
+        """Aktuelle Version und (id, Buch oder None bei gelöscht) für alle seit `version` geänderten Bücher.
+
+        None, wenn das Protokoll die Lücke nicht abdeckt (Startdaten, zu weit zurück); dann `load`.
+        """
+        conn = self._connection()
+        conn.execute("BEGIN")
+        try:
+            current = conn.execute("SELECT version FROM meta").fetchone()[0]
+            if current - version > MAX_CHANGES:
+                return None
+            book_ids = [row[0] for row in conn.execute(
+                "SELECT book_id FROM changes WHERE version > ? ORDER BY version", (version,)
+            )]
+            if len(book_ids) != current - version or None in book_ids:
+                return None
+            book_ids = list(dict.fromkeys(book_ids))
+            rows = conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM books WHERE id IN ({', '.join('?' * len(book_ids))})", book_ids
+            ).fetchall()
+        finally:
+            conn.execute("COMMIT")
+        books = {row[0]: self.factory(*row) for row in rows}
+        return current, [(book_id, books.get(book_id)) for book_id in book_ids]
+
+    def seed(self, books):
+        """Legt die Startdaten an, falls die Datenbank noch leer ist (nur der erste Worker)."""
+        with self._write() as conn:
+            if conn.execute("SELECT 1 FROM books LIMIT 1").fetchone() is None:
+                conn.executemany(f"INSERT INTO books VALUES ({', '.join('?' * len(COLUMNS))})", map(_row, books))
+                return self._bump(conn)
+
+    def insert(self, book) -> int:
+        with self._write() as conn:
+            cursor = conn.execute(f"INSERT OR REPLACE INTO books VALUES ({', '.join('?' * len(COLUMNS))})", _row(book))
+            book.id = cursor.lastrowid
+            return self._bump(conn, book.id)
+
+    def update(self, book) -> int | None:
+        with self._write() as conn:
+            assignments = ", ".join(f"{column} = ?" for column in COLUMNS[1:])
+            cursor = conn.execute(f"UPDATE books SET {assignments} WHERE id = ?", (*_row(book)[1:], book.id))
+            return self._bump(conn, book.id) if cursor.rowcount else None
+
+    def delete(self, book_id: int) -> int | None:
+        with self._write() as conn:
+            cursor = conn.execute("DELETE FROM books WHERE id = ?", (book_id,))
+            return self._bump(conn, book_id) if cursor.rowcount else None
+
+    @contextmanager
+    def _write(self):
+        # BEGIN IMMEDIATE: Schreibzugriffe verschiedener Worker laufen nacheinander.
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    @staticmethod
+    def _bump(conn, book_id: int | None = None) -> int:
+        """Erhöht die Version und protokolliert die geänderte id (None = alles, z.B. Startdaten)."""
+        conn.execute("UPDATE meta SET version = version + 1")
+        version = conn.execute("SELECT version FROM meta").fetchone()[0]
+        conn.execute("INSERT INTO changes VALUES (?, ?)", (version, book_id))
+        conn.execute("DELETE FROM changes WHERE version <= ?", (version - MAX_CHANGES,))
+        return version
+
+
+def _row(book) -> tuple:
+    return tuple(getattr(book, column) for column in COLUMNS)
@@ -1,10 +1,19 @@
+import os
+import sys
+from dataclasses import dataclass
 from fastapi import FastAPI, Path, Query, HTTPException
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, Field
 from typing import Optional
 from starlette import status
+from book_store import BookStore, SQLiteBacking
+from search_index import SearchIndex
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 
+# slots=True: kein __dict__ pro Buch (deutlich weniger Speicher bei vielen Büchern),
+# orjson serialisiert Dataclasses direkt zu JSON-Bytes:
+@dataclass(slots=True)
 class Book():
     id: int
     title: str
@@ -12,14 +21,10 @@ class Book():
     description: str
     rating: int
     published_date: int
-    
-    def __init__(self, id, title, author, description, rating, published_date):
-        self.id = id
-        self.title = title
-        self.author = author
-        self.description = description
-        self.rating = rating
-        self.published_date = published_date
+
+    def __post_init__(self):
+        # Viele Bücher teilen sich einen Autor, der String wird nur einmal gehalten:
+        self.author = sys.intern(self.author)
         
 class BookRequest(BaseModel):
     id: Optional[int] = Field(description="ID ist not needed on create", default=None)
@@ -41,69 +46,63 @@ class BookRequest(BaseModel):
         }
     }
         
-BOOKS = [
+# Optional: gemeinsame SQLite-Datei, damit alle uvicorn-Worker dieselben Bücher sehen,
+# z.B. BOOKS_DB=./books.db (ohne die Variable hat jeder Worker seine eigene Kopie im Speicher):
+BOOKS_DB = os.getenv("BOOKS_DB")
+
+BOOKS = BookStore([
     Book(1, "Computer Science Pro", "codingwithroby", "A very nice book!", 5, 2030),
     Book(2, "Be Fast with FastAPI", "codingwithroby", "A great book!", 5, 230),
     Book(3, "Master Endpoints", "codingwithroby", "A awesome book!", 5, 2029),
     Book(4, "HP1", "Author 1", "Book Description", 2, 2028),
     Book(5, "HP2", "Author 2", "Book Description", 3, 2027),
     Book(6, "HP3", "Author 3", "Book Description", 1, 2026)
-]
+], backing=SQLiteBacking(BOOKS_DB, Book) if BOOKS_DB else None, search_index=SearchIndex())
 
 @app.get("/books", status_code=status.HTTP_200_OK)
 async def read_all_books():
-    return BOOKS
+    return ORJSONResponse(BOOKS.all())
+
+# Muss vor /books/{book_id} stehen, sonst wird "search" als book_id gelesen:
+@app.get("/books/search", status_code=status.HTTP_200_OK)
+async def search_books(q: str = Query(min_length=1, max_length=200),
+                       limit: int = Query(default=20, gt=0, le=100),
+                       offset: int = Query(default=0, ge=0)):
+    total, books = BOOKS.search(q, limit=limit, offset=offset)
+    return ORJSONResponse(books, headers={"X-Total-Count": str(total)})
 
 @app.get("/books/{book_id}", status_code=status.HTTP_200_OK)
 async def read_book(book_id: int = Path(gt=0)):
-    for book in BOOKS:
-        if book.id == book_id:
-            return book
+    book = BOOKS.get(book_id)
+    if book is not None:
+        return ORJSONResponse(book)
     raise HTTPException(status_code=404, detail="Item not found")
         
 @app.get("/books/publish/", status_code=status.HTTP_200_OK)
 async def read_books_by_publish_date(published_date: int = Query(gt=1999, lt=2031)):
-    books_to_return = []
-    for book in BOOKS:
-        if book.published_date == published_date:
-            books_to_return.append(book)
-    return books_to_return
+    return ORJSONResponse(BOOKS.by_published_date(published_date))
 
 @app.post("/create-book", status_code=status.HTTP_201_CREATED)
 async def create_book(book_request:BookRequest):
     new_book = Book(**book_request.model_dump())
-    BOOKS.append(find_book_id(new_book))
-    
-def find_book_id(book: Book):
-    book.id = 1 if len(BOOKS) ==  0 else BOOKS[-1].id + 1
-    return book
+    # Die id vergibt der Speicher beim Einfügen (unter seiner Sperre bzw. in der Datenbank),
+    # so können zwei gleichzeitige Anfragen nicht dieselbe id bekommen:
+    new_book.id = None
+    BOOKS.add(new_book)
 
 @app.get("/books/", status_code=status.HTTP_200_OK)
 async def read_book_by_rating(book_rating: int = Query(gt=0, lt=6)):
-    books_to_return = []
-    for book in BOOKS:
-        if book.rating == book_rating:
-            books_to_return.append(book)
-    return books_to_return
+    return ORJSONResponse(BOOKS.by_rating(book_rating))
 
 @app.put("/books/update_book", status_code=status.HTTP_204_NO_CONTENT)
 async def update_book(book:BookRequest):
-    book_changed = False
-    for i in range(len(BOOKS)):
-        if BOOKS[i].id == book.id:
-            BOOKS[i] = book
-            book_changed = True
+    book_changed = BOOKS.update(Book(**book.model_dump()))
     if not book_changed:
         raise HTTPException(status_code=404, detail="Item not found")
             
 @app.delete("/books/{book_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_book(book_id: int = Path(gt=0)):
-    book_changed = False
-    for i in range(len(BOOKS)):
-        if BOOKS[i].id == book_id:
-            BOOKS.pop(i)
-            book_changed = True
-            break
+    book_changed = BOOKS.delete(book_id)
     if not book_changed:
         raise HTTPException(status_code=404, detail="Item not found")
         
\ No newline at end of file
@@ -0,0 +1,160 @@
+import heapq
+import re
+import threading
+from bisect import bisect_left, insort
+from collections import Counter
+
+TOKEN_PATTERN = re.compile(r"\w+")
+# Trennzeichen in `_book_terms` (kommt in keinem Wort vor):
+SEPARATOR = "\x00"
+
+# Treffer im Titel zählen mehr als im Autor, diese mehr als in der Beschreibung:
+FIELD_WEIGHTS = {"title": 3.0, "author": 2.0, "description": 1.0}
+# Ein vollständig getroffenes Wort zählt mehr als ein Treffer über ein Präfix:
+EXACT_BOOST = 2.0
+
+
+def tokenize(text) -> list[str]:
+    return TOKEN_PATTERN.findall(str(text).casefold())
+
+
+class SearchIndex:
+    """Invertierter Index über Titel, Autor und Beschreibung der Bücher.
+
+    - `_postings`: Wort -> {id: Gewicht}
+    - `_terms`: alle Wörter sortiert, für die Präfixsuche per bisect
+    - `_book_terms`: id -> Wörter des Buchs als ein String ("\\x00wort1\\x00wort2"), damit
+      `replace` nur diese Einträge anfasst und ein Präfix mit einem einzigen `find` geprüft wird
+
+    Änderungen werden inkrementell pro Buch eingepflegt, auch die anderer Worker (siehe
+    `BookStore._catch_up`). Ein kompletter Neuaufbau (`rebuild`) ist nur beim Start nötig und
+    wenn ein Worker weiter zurückliegt, als das Änderungsprotokoll reicht.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = {}
+        self._terms = []
+        self._book_terms = {}
+
+    def rebuild(self, books):
+        postings, book_terms = {}, {}
+        for book in books:
+            weights = _weights(book)
+            for term, weight in weights.items():
+                postings.setdefault(term, {})[book.id] = weight
+            book_terms[book.id] = _join(weights)
+        with self._lock:
+            self._postings, self._terms, self._book_terms = postings, sorted(postings), book_terms
+
+    def replace(self, old_book, new_book):
+        """Entfernt `old_book` und/oder fügt `new_book` hinzu (create/update/delete)."""
+        with self._lock:
+            if old_book is not None:
+                self._remove(old_book.id)
+            if new_book is not None:
+                self._add(new_book)
+
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> tuple[int, list[int]]:
+        """Sucht Bücher, die alle Wörter der Anfrage (auch als Präfix) enthalten.
+
+        Gibt die Gesamtzahl der Treffer und die ids der Seite zurück, nach Relevanz sortiert
+        (bei gleicher Relevanz in der Reihenfolge des Index). Ein Präfix wird auf alle passenden
+        Wörter erweitert, nur die Seite ist begrenzt; sehr kurze Präfixe kosten deshalb mehr.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return 0, []
+        with self._lock:
+            # Mit dem seltensten Wort beginnen; die übrigen Wörter werden nur noch an dessen
+            # Treffern geprüft (über `_book_terms`), statt ihre Trefferlisten aufzubauen:
+            expanded = sorted((self._expand(token) for token in dict.fromkeys(tokens)), key=lambda item: item[2])
+            token, terms, _ = expanded[0]
+            scores = self._match(token, terms)
+            for token, terms, size in expanded[1:]:
+                # Exakte Wörter: fertige Trefferliste, nur Lookups. Präfixe: eine Trefferliste aufzubauen
+                # kostet pro Eintrag etwa so viel wie ein `find` im Buch.
+                if terms == [token]:
+                    posting = self._postings[token]
+                    scores = {book_id: score + _term_weight(token, token, posting[book_id])
+                              for book_id, score in scores.items() if book_id in posting}
+                elif size <= len(scores):
+                    other = self._match(token, terms)
+                    scores = {book_id: score + other[book_id] for book_id, score in scores.items() if book_id in other}
+                else:
+                    scores = {book_id: score + weight for book_id, score in scores.items()
+                              if (weight := self._book_weight(book_id, token))}
+                if not scores:
+                    break
+            page = heapq.nlargest(offset + limit, scores, key=scores.__getitem__)[offset:]
+        return len(scores), page
+
+    def __len__(self):
+        return len(self._book_terms)
+
+    def _expand(self, token: str) -> tuple[str, list[str], int]:
+        """Alle Wörter, die mit `token` beginnen, und ihre Trefferzahl (Summe der Trefferlisten)."""
+        start = end = bisect_left(self._terms, token)
+        while end < len(self._terms) and self._terms[end].startswith(token):
+            end += 1
+        terms = self._terms[start:end]
+        return token, terms, sum(len(self._postings[term]) for term in terms)
+
+    def _match(self, token: str, terms: list[str]) -> dict:
+        """id -> Gewicht für ein Wort der Anfrage (exakt oder als Präfix), siehe `_term_weight`."""
+        scores = {}
+        for term in terms:
+            for book_id, weight in self._postings[term].items():
+                weight = _term_weight(token, term, weight)
+                if weight > scores.get(book_id, 0.0):
+                    scores[book_id] = weight
+        return scores
+
+    def _book_weight(self, book_id: int, token: str) -> float:
+        """Dasselbe Gewicht wie `_match`, aber nur für ein Buch über `_book_terms` (0, wenn kein Wort passt)."""
+        terms = self._book_terms.get(book_id, "")
+        best = 0.0
+        start = terms.find(SEPARATOR + token)
+        while start >= 0:
+            end = terms.find(SEPARATOR, start + 1)
+            if end < 0:
+                end = len(terms)
+            term = terms[start + 1:end]
+            best = max(best, _term_weight(token, term, self._postings[term][book_id]))
+            start = terms.find(SEPARATOR + token, end)
+        return best
+
+    def _add(self, book):
+        weights = _weights(book)
+        for term, weight in weights.items():
+            posting = self._postings.get(term)
+            if posting is None:
+                posting = self._postings[term] = {}
+                insort(self._terms, term)
+            posting[book.id] = weight
+        self._book_terms[book.id] = _join(weights)
+
+    def _remove(self, book_id: int):
+        for term in self._book_terms.pop(book_id, "").split(SEPARATOR)[1:]:
+            posting = self._postings[term]
+            del posting[book_id]
+            if not posting:
+                del self._postings[term]
+                del self._terms[bisect_left(self._terms, term)]
+
+
+def _weights(book) -> Counter:
+    weights = Counter()
+    for field, weight in FIELD_WEIGHTS.items():
+        for term in tokenize(getattr(book, field)):
+            weights[term] += weight
+    return weights
+
+
+def _term_weight(token: str, term: str, weight: float) -> float:
+    """Gewicht eines Worts im Buch für ein Wort der Anfrage; passen mehrere Wörter, zählt das höchste."""
+    return weight * EXACT_BOOST if term == token else weight
+
+
+def _join(terms) -> str:
+    return "".join(SEPARATOR + term for term in terms)
@@ -0,0 +1,316 @@
+"""Benchmarks für die Todo-App.
+
+Aufruf aus diesem Verzeichnis, z.B.:
+    python benchmark.py async-db --concurrency 50
+    python benchmark.py bulk --items 500
+    python benchmark.py sqlite --writers 4 --readers 4
+    python benchmark.py serialize --rows 50000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from contextlib import asynccontextmanager
+
+import httpx
+
+from sqlalchemy import create_engine, select, func
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+# Die App-Module (models, main, ...) werden erst in den Funktionen importiert: database.py liest
+# DATABASE_URL beim Import, die Benchmark-Datenbank muss also vorher gesetzt sein.
+
+
+def percentile(values: list, p: float) -> float:
+    """Berechnet das p-Perzentil (0-100) einer Liste von Messwerten."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(p / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def seed_database(path: str, users: int, todos_per_user: int):
+    """Legt eine frische SQLite-Datenbank mit Testdaten an."""
+    import models
+
+    engine = create_engine(f"sqlite:///{path}")
+    models.Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(models.Users.__table__.insert(), [
+            {"id": u, "username": f"user{u}", "email": f"user{u}@example.com", "role": "user", "is_active": True}
+            for u in range(1, users + 1)
+        ])
+        conn.execute(models.Todos.__table__.insert(), [
+            {"title": f"Todo {t}", "description": "Benchmark", "priority": t % 5 + 1,
+             "complete": t % 2 == 0, "owenr_id": u}
+            for u in range(1, users + 1) for t in range(todos_per_user)
+        ])
+    engine.dispose()
+
+
+async def measure_loop_lag(stop: asyncio.Event, lags: list, interval: float = 0.005):
+    """Misst, wie stark der Event Loop verzögert wird (Indikator für blockierende Aufrufe)."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+def slow_query(owner_id: int):
+    from models import Todos
+
+    # Absichtlich teure Abfrage (Volltextsuche ohne Index), wie eine langsame Produktionsabfrage:
+    return select(func.count(Todos.id)).where(Todos.owenr_id == owner_id).where(Todos.description.like("%mark%"))
+
+
+async def run_sync_sessions(path: str, concurrency: int, requests: int, users: int) -> dict:
+    """Bisheriges Verhalten: synchrone Session innerhalb eines async Handlers."""
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    session_factory = sessionmaker(bind=engine)
+
+    async def handler(i: int):
+        with session_factory() as db:
+            db.execute(slow_query(i % users + 1)).scalar()
+
+    result = await drive(handler, concurrency, requests)
+    engine.dispose()
+    return result
+
+
+async def run_async_sessions(path: str, concurrency: int, requests: int, users: int) -> dict:
+    """Neues Verhalten: AsyncSession über aiosqlite."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}", connect_args={"check_same_thread": False})
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+
+    async def handler(i: int):
+        async with session_factory() as db:
+            (await db.execute(slow_query(i % users + 1))).scalar()
+
+    result = await drive(handler, concurrency, requests)
+    await engine.dispose()
+    return result
+
+
+async def drive(handler, concurrency: int, requests: int) -> dict:
+    """Führt `requests` Aufrufe mit fester Parallelität aus und sammelt die Kennzahlen.
+
+    Die Loop-Verzögerung entspricht der Wartezeit, die eine beliebige andere (schnelle)
+    Anfrage zusätzlich erleben würde, solange die Abfragen laufen.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    stop = asyncio.Event()
+    lags = []
+
+    async def limited(i: int):
+        async with semaphore:
+            await handler(i)
+
+    ticker = asyncio.create_task(measure_loop_lag(stop, lags))
+    start = time.perf_counter()
+    await asyncio.gather(*(limited(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await ticker
+
+    return {
+        "rps": requests / elapsed,
+        "lag_p50_ms": percentile(lags, 50) * 1000,
+        "lag_p99_ms": percentile(lags, 99) * 1000,
+        "lag_max_ms": max(lags, default=0.0) * 1000,
+    }
+
+
+def print_result(name: str, result: dict):
+    print(f"{name:<22}" + "  ".join(f"{key}={value:9.2f}" for key, value in result.items()))
+
+
+def bench_async_db(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        seed_database(path, args.users, args.todos)
+        print(f"{args.requests} Anfragen, Parallelität {args.concurrency}")
+        print_result("sync Session", asyncio.run(run_sync_sessions(path, args.concurrency, args.requests, args.users)))
+        print_result("AsyncSession", asyncio.run(run_async_sessions(path, args.concurrency, args.requests, args.users)))
+
+
+async def contention_worker(path: str, profile: str, role: str, duration: float) -> dict:
+    """Ein Worker-Prozess (wie ein uvicorn-Worker), der nur schreibt (UPDATE + Commit) oder nur liest."""
+    from sqlalchemy import exc, update
+    from database import build_engine
+    from models import Todos
+
+    engine = build_engine(f"sqlite+aiosqlite:///{path}", profile=profile)
+    operations, errors, latencies = 0, 0, []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            async with engine.begin() as conn:
+                if role == "writer":
+                    await conn.execute(update(Todos).where(Todos.id == os.getpid() % 1000 + 1).values(priority=Todos.priority % 5 + 1))
+                else:
+                    (await conn.execute(select(Todos.id, Todos.title).where(Todos.owenr_id == os.getpid() % 20 + 1))).all()
+            operations += 1
+            latencies.append(time.perf_counter() - start)
+        except exc.OperationalError:
+            # "database is locked"
+            errors += 1
+    await engine.dispose()
+    return {"role": role, "operations": operations, "errors": errors, "latencies": latencies}
+
+
+def run_contention_process(job: tuple) -> dict:
+    return asyncio.run(contention_worker(*job))
+
+
+def bench_sqlite(args):
+    from multiprocessing import Pool
+    from database import SQLITE_PROFILES
+
+    print(f"{args.writers} Schreib- und {args.readers} Lese-Prozesse, {args.duration}s pro Profil")
+    for profile in SQLITE_PROFILES:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.db")
+            seed_database(path, 20, 1000)
+            jobs = [(path, profile, "writer", args.duration)] * args.writers + [(path, profile, "reader", args.duration)] * args.readers
+            with Pool(len(jobs)) as pool:
+                results = pool.map(run_contention_process, jobs)
+
+        summary = {}
+        for role in ("writer", "reader"):
+            role_results = [result for result in results if result["role"] == role]
+            latencies = [latency for result in role_results for latency in result["latencies"]]
+            summary[f"{role}_ops_s"] = sum(result["operations"] for result in role_results) / args.duration
+            summary[f"{role}_p99_ms"] = percentile(latencies, 99) * 1000
+        summary["errors"] = sum(result["errors"] for result in results)
+        print_result(profile, summary)
+
+
+def bench_serialize(args):
+    """Zeilen pro Sekunde für Laden + Serialisieren einer Todo-Liste: ORM + jsonable_encoder vs. Zeilen + orjson."""
+    import json
+    import orjson
+    from fastapi.encoders import jsonable_encoder
+    from models import Todos
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        seed_database(path, 1, args.rows)
+        engine = create_engine(f"sqlite:///{path}")
+        session_factory = sessionmaker(bind=engine)
+        columns = list(Todos.__table__.columns)
+
+        def orm_jsonable_encoder():
+            with session_factory() as db:
+                return json.dumps(jsonable_encoder(db.execute(select(Todos)).scalars().all())).encode()
+
+        def rows_orjson():
+            with session_factory() as db:
+                return orjson.dumps([dict(row) for row in db.execute(select(*columns)).mappings()])
+
+        print(f"{args.rows} Zeilen, bestes von {args.repeat} Durchläufen")
+        for name, func in (("ORM + jsonable_encoder", orm_jsonable_encoder), ("Zeilen + orjson", rows_orjson)):
+            best = min(timed(func) for _ in range(args.repeat))
+            print(f"{name:<24}{best * 1000:10.1f} ms  {args.rows / best:12.0f} Zeilen/s")
+        engine.dispose()
+
+
+def timed(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+@asynccontextmanager
+async def app_client(workdir: str):
+    """Startet die App in-process (mit Lifespan) auf einer frischen Datenbank in `workdir`
+    und liefert einen angemeldeten httpx-Client."""
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(workdir, 'todoapps.db')}"
+    from main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            await client.post("/auth/", json={
+                "username": "bench", "email": "bench@example.com", "first_name": "Bench",
+                "last_name": "Mark", "password": "bench", "role": "admin",
+            })
+            response = await client.post("/auth/token", data={"username": "bench", "password": "bench"})
+            client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+            yield client
+
+
+async def run_bulk(items: int) -> dict:
+    todo = {"title": "Bulk todo", "description": "Benchmark", "priority": 3, "complete": False}
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        async with app_client(tmp) as client:
+            start = time.perf_counter()
+            for _ in range(items):
+                await client.post("/todo", json=todo)
+            results["POST /todo (einzeln)"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            response = await client.post("/todo/bulk", json=[todo] * items)
+            results["POST /todo/bulk"] = time.perf_counter() - start
+            ids = [item["id"] for item in response.json()]
+
+            start = time.perf_counter()
+            for todo_id in ids:
+                await client.put(f"/todo/{todo_id}", json={**todo, "complete": True})
+            results["PUT /todo/{id} (einzeln)"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            await client.put("/todo/bulk", json=[{**todo, "id": todo_id, "complete": True} for todo_id in ids])
+            results["PUT /todo/bulk"] = time.perf_counter() - start
+
+            half = len(ids) // 2
+            start = time.perf_counter()
+            for todo_id in ids[:half]:
+                await client.delete(f"/todo/{todo_id}")
+            results["DELETE /todo/{id} (einzeln)"] = (time.perf_counter() - start) * items / max(half, 1)
+
+            start = time.perf_counter()
+            await client.request("DELETE", "/todo/bulk", json=ids[half:])
+            results["DELETE /todo/bulk"] = (time.perf_counter() - start) * items / max(len(ids) - half, 1)
+    return results
+
+
+def bench_bulk(args):
+    results = asyncio.run(run_bulk(args.items))
+    print(f"{args.items} Todos (DELETE auf {args.items} hochgerechnet)")
+    for name, seconds in results.items():
+        print(f"{name:<30}{seconds * 1000:10.1f} ms  {args.items / seconds:10.0f} Todos/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks für die Todo-App")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    async_db = subparsers.add_parser("async-db", help="sync Session vs. AsyncSession in async Handlern")
+    async_db.add_argument("--users", type=int, default=20)
+    async_db.add_argument("--todos", type=int, default=2000, help="Todos pro Benutzer")
+    async_db.add_argument("--requests", type=int, default=400)
+    async_db.add_argument("--concurrency", type=int, default=50)
+    async_db.set_defaults(func=bench_async_db)
+
+    bulk = subparsers.add_parser("bulk", help="Bulk-Endpunkte vs. einzelne Todo-Routen")
+    bulk.add_argument("--items", type=int, default=500)
+    bulk.set_defaults(func=bench_bulk)
+
+    sqlite = subparsers.add_parser("sqlite", help="Schreib-/Lese-Konkurrenz mehrerer Prozesse je SQLite-Profil")
+    sqlite.add_argument("--writers", type=int, default=4)
+    sqlite.add_argument("--readers", type=int, default=4)
+    sqlite.add_argument("--duration", type=float, default=5.0)
+    sqlite.set_defaults(func=bench_sqlite)
+
+    serialize = subparsers.add_parser("serialize", help="Serialisierung von Todo-Listen vorher/nachher")
+    serialize.add_argument("--rows", type=int, default=50000)
+    serialize.add_argument("--repeat", type=int, default=3)
+    serialize.set_defaults(func=bench_serialize)
+
+    args = parser.parse_args()
+    args.func(args)
@@ -1,11 +1,80 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import os
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./todoapps.db"
+# Datenbank per Umgebungsvariable wählbar, z.B. DATABASE_URL=postgresql://user:pw@host/todos
+# Standard ist die lokale SQLite-Datei. aiosqlite führt die SQLite-Aufrufe in einem eigenen
+# Thread aus, dadurch blockiert eine langsame Abfrage nicht den Event Loop von FastAPI:
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./todoapps.db")
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+# Async-Treiber, die für URLs ohne expliziten Treiber verwendet werden:
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+}
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# PRAGMA-Profile, die auf jede neue SQLite-Verbindung angewendet werden:
+# - journal_mode=WAL: Leser blockieren Schreiber nicht mehr (und umgekehrt)
+# - busy_timeout: bei einer Sperre bis zu x ms warten statt sofort "database is locked"
+# - synchronous=NORMAL: im WAL-Modus sicher, spart ein fsync pro Commit
+# - mmap_size / cache_size: mehr Seiten im Speicher halten (cache_size negativ = KiB)
+SQLITE_PROFILES = {
+    "default": {},
+    "tuned": {
+        "journal_mode": "WAL",
+        "busy_timeout": 5000,
+        "synchronous": "NORMAL",
+        "mmap_size": 268435456,
+        "cache_size": -65536,
+    },
+}
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "tuned")
+
+# Verbindungen pro Worker-Prozess; bei mehreren uvicorn-Workern hat jeder seinen eigenen Pool,
+# die Datenbank muss also (Worker * (POOL_SIZE + MAX_OVERFLOW)) Verbindungen erlauben.
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+# Verbindung vor der Ausgabe aus dem Pool prüfen (abgebrochene Server-Verbindungen erkennen):
+POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+# Verbindungen nach x Sekunden erneuern (kommt Idle-Timeouts von Server/Proxy zuvor):
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# Bei vielen Workern das Schema besser einmalig separat anlegen und hier "false" setzen:
+CREATE_TABLES = os.getenv("DB_CREATE_TABLES", "true").lower() in ("1", "true", "yes")
+
+def async_url(url: str):
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.drivername, url.drivername))
+
+def build_engine(url: str = SQLALCHEMY_DATABASE_URL, profile: str = SQLITE_PROFILE):
+    url = async_url(url)
+    is_sqlite = url.get_backend_name() == "sqlite"
+    engine = create_async_engine(
+        url,
+        connect_args={"check_same_thread": False} if is_sqlite else {},
+        pool_size=POOL_SIZE,
+        max_overflow=MAX_OVERFLOW,
+        pool_pre_ping=POOL_PRE_PING,
+        pool_recycle=POOL_RECYCLE,
+    )
+    if not is_sqlite:
+        return engine
+    pragmas = SQLITE_PROFILES[profile]
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    return engine
+
+engine = build_engine()
+
+# expire_on_commit=False, damit nach dem Commit kein implizites (synchrones) Nachladen nötig ist:
+SessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
 
 Base = declarative_base()
\ No newline at end of file
@@ -0,0 +1,88 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from passlib.context import CryptContext
+
+# Obergrenzen (in Sekunden) der Latenz-Buckets für die Hash-Metriken:
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class HashingPoolFull(Exception):
+    """Wird ausgelöst, wenn die Warteschlange des Hashing-Pools voll ist."""
+
+
+class HashingPool:
+    """Führt bcrypt-Hashing und -Verifikation in einem begrenzten Thread-Pool aus.
+
+    bcrypt gibt während der Berechnung den GIL frei, daher reichen Threads aus, um den
+    Event Loop zu entlasten. Es laufen höchstens `max_workers` Berechnungen gleichzeitig,
+    höchstens `max_queue` weitere warten. Alles darüber wird sofort mit HashingPoolFull
+    abgelehnt (Backpressure), statt den Server mit einem Login-Sturm zu überlasten.
+    """
+
+    def __init__(self, context: CryptContext, max_workers: int = 4, max_queue: int = 64):
+        self.context = context
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+        # Alle Zähler werden nur im Event-Loop-Thread verändert, daher ohne Lock:
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_seconds = 0.0
+        self._latency_seconds = 0.0
+        self._latency_max = 0.0
+        self._latency_buckets = [0] * len(LATENCY_BUCKETS)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run(self.context.verify, password, hashed_password)
+
+    async def _run(self, func, *args):
+        if self._in_flight >= self.max_workers + self.max_queue:
+            self._rejected += 1
+            raise HashingPoolFull("Hashing pool is saturated.")
+
+        self._in_flight += 1
+        submitted = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            started, result = await loop.run_in_executor(self._executor, _timed, func, args)
+        finally:
+            self._in_flight -= 1
+
+        latency = time.perf_counter() - submitted
+        self._completed += 1
+        self._wait_seconds += started - submitted
+        self._latency_seconds += latency
+        self._latency_max = max(self._latency_max, latency)
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if latency <= bound:
+                self._latency_buckets[index] += 1
+        return result
+
+    def stats(self) -> dict:
+        """Aktuelle Kennzahlen des Pools (Warteschlangenlänge, Latenzen, Ablehnungen)."""
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "queue_depth": max(0, self._in_flight - self.max_workers),
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "wait_seconds_sum": self._wait_seconds,
+            "latency_seconds_sum": self._latency_seconds,
+            "latency_seconds_max": self._latency_max,
+            "latency_buckets": dict(zip(LATENCY_BUCKETS, self._latency_buckets)),
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _timed(func, args):
+    # Läuft im Worker-Thread: liefert den Startzeitpunkt mit, um die Wartezeit zu messen.
+    started = time.perf_counter()
+    return started, func(*args)
@@ -0,0 +1,144 @@
+import logging
+import os
+import time
+from collections import Counter
+from contextvars import ContextVar
+from sqlalchemy import event
+
+# Nur wenn aktiviert, werden Middleware, SQL-Events und /metrics registriert (sonst kein Overhead):
+ENABLED = os.getenv("TODO_INSTRUMENTATION", "false").lower() in ("1", "true", "yes")
+# Optional den Header "Server-Timing" (app/db-Zeit, Anzahl Statements) an jede Antwort hängen:
+SERVER_TIMING = os.getenv("TODO_SERVER_TIMING", "false").lower() in ("1", "true", "yes")
+# Ab so vielen identischen Statements in einer Anfrage wird ein N+1-Muster gemeldet:
+N_PLUS_ONE_THRESHOLD = 5
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+STATEMENT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+logger = logging.getLogger("todo.instrumentation")
+
+
+class Histogram:
+    """Prometheus-Histogramm mit Labels (kumulative Buckets, Summe, Anzahl)."""
+
+    def __init__(self, name: str, help: str, buckets: tuple):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, labels: tuple, value: float):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[0][index] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self, label_names: tuple) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (bucket_counts, total, count) in self._series.items():
+            label_text = format_labels(label_names, labels)
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {bucket_count}')
+            lines.append(f'{self.name}_bucket{{{label_text},le="+Inf"}} {count}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {total}")
+            lines.append(f"{self.name}_count{{{label_text}}} {count}")
+        return lines
+
+
+class RequestStats:
+    """SQL-Kennzahlen einer einzelnen Anfrage (über eine ContextVar an die SQL-Events gebunden)."""
+
+    def __init__(self):
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.statement_counts = Counter()
+
+
+_current_stats: ContextVar[RequestStats | None] = ContextVar("todo_request_stats", default=None)
+
+REQUEST_LATENCY = Histogram("http_request_duration_seconds", "Request latency per route.", LATENCY_BUCKETS)
+REQUEST_STATEMENTS = Histogram("db_statements_per_request", "SQL statements per request.", STATEMENT_BUCKETS)
+REQUEST_DB_TIME = Histogram("db_time_seconds_per_request", "Total SQL time per request.", LATENCY_BUCKETS)
+N_PLUS_ONE = Counter()
+
+
+def format_labels(names: tuple, values: tuple) -> str:
+    return ",".join(f'{name}="{value}"' for name, value in zip(names, values))
+
+
+def instrument_engine(engine):
+    """Registriert Zeitmessung und Zählung aller SQL-Statements an der (async) Engine."""
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._query_start = time.perf_counter()
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = _current_stats.get()
+        if stats is None:
+            return
+        stats.statements += 1
+        stats.db_seconds += time.perf_counter() - context._query_start
+        stats.statement_counts[statement] += 1
+
+
+class InstrumentationMiddleware:
+    """ASGI-Middleware: misst Latenz, SQL-Statements und DB-Zeit pro Route."""
+
+    def __init__(self, app, server_timing: bool = SERVER_TIMING):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current_stats.set(stats)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.server_timing:
+                    elapsed_ms = (time.perf_counter() - start) * 1000
+                    timing = f"app;dur={elapsed_ms:.1f}, db;dur={stats.db_seconds * 1000:.1f};desc=\"{stats.statements} statements\""
+                    message["headers"] = [*message.get("headers", []), (b"server-timing", timing.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_stats.reset(token)
+            elapsed = time.perf_counter() - start
+            route = scope.get("route")
+            # Route-Template statt konkretem Pfad, damit /todo/1 und /todo/2 zusammen gezählt werden:
+            labels = (scope["method"], route.path if route is not None else "unmatched")
+            REQUEST_LATENCY.observe((*labels, str(status_code)), elapsed)
+            REQUEST_STATEMENTS.observe(labels, stats.statements)
+            REQUEST_DB_TIME.observe(labels, stats.db_seconds)
+            check_n_plus_one(labels, stats)
+
+
+def check_n_plus_one(labels: tuple, stats: RequestStats):
+    for statement, count in stats.statement_counts.items():
+        if count >= N_PLUS_ONE_THRESHOLD:
+            N_PLUS_ONE[labels] += 1
+            logger.warning("Possible N+1 query in %s %s: %d x %s", *labels, count, " ".join(statement.split())[:200])
+
+
+def render_metrics() -> list[str]:
+    lines = REQUEST_LATENCY.render(("method", "route", "status"))
+    lines += REQUEST_STATEMENTS.render(("method", "route"))
+    lines += REQUEST_DB_TIME.render(("method", "route"))
+    lines += ["# HELP n_plus_one_total Requests with repeated identical SQL statements.", "# TYPE n_plus_one_total counter"]
+    lines += [f"n_plus_one_total{{{format_labels(('method', 'route'), labels)}}} {count}" for labels, count in N_PLUS_ONE.items()]
+    return lines
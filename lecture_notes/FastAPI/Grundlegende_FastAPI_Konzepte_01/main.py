@@ -1,17 +1,54 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import inspect, text
 import models
-from database import engine
-from routers import auth, todos, admin
+from database import engine, CREATE_TABLES
+from routers import auth, todos, admin, metrics
+import instrumentation
 import uvicorn
 
-app = FastAPI()
+def create_missing_indexes(conn):
+    for table in models.Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
 
-models.Base.metadata.create_all(bind=engine)
+def add_missing_columns(conn):
+    # create_all ergänzt keine Spalten in bestehenden Tabellen, neue Spalten daher per ALTER TABLE nachziehen:
+    inspector = inspect(conn)
+    for table in models.Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            default = f" DEFAULT {column.server_default.arg}" if column.server_default is not None else ""
+            conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(conn.dialect)}{default}"))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Tabellen beim Start anlegen (mit der async Engine über run_sync):
+    if CREATE_TABLES:
+        async with engine.begin() as conn:
+            await conn.run_sync(models.Base.metadata.create_all)
+            await conn.run_sync(add_missing_columns)
+            # create_all legt Indizes nur für neue Tabellen an, daher fehlende Indizes nachziehen:
+            await conn.run_sync(create_missing_indexes)
+    yield
+    auth.hashing_pool.shutdown()
+    await engine.dispose()
+
+# orjson serialisiert deutlich schneller als json + jsonable_encoder:
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 app.include_router(auth.router)
 app.include_router(todos.router)
 app.include_router(admin.router)
 
+if instrumentation.ENABLED:
+    instrumentation.instrument_engine(engine)
+    app.add_middleware(instrumentation.InstrumentationMiddleware)
+    app.include_router(metrics.router)
+
 
 
 if __name__ == "__main__":
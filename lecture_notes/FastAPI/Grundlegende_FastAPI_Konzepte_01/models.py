@@ -1,5 +1,5 @@
 from database import Base
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, Float, String, Boolean, ForeignKey, Index
 
 class Users(Base):
     __tablename__ = "users"
@@ -12,6 +12,10 @@ class Users(Base):
     hashed_password = Column(String)
     is_active = Column(Boolean, default=True)
     role = Column(String)
+    # Wird mit jeder Änderung an den Todos des Benutzers erhöht; die Antwort-Caches aller Worker prüfen daran ihre Einträge:
+    todos_version = Column(Integer, nullable=False, default=0, server_default="0")
+    # Unix-Zeit; Tokens mit älterem "iat" werden in allen Workern abgelehnt (gesetzt beim Sperren des Benutzers):
+    tokens_valid_after = Column(Float, nullable=False, default=0, server_default="0")
 
 class Todos(Base):
     __tablename__ = "todos"
@@ -22,4 +26,11 @@ class Todos(Base):
     priority = Column(Integer)
     complete = Column(Boolean, default=False)
     owenr_id = Column(Integer, ForeignKey("users.id"))
+
+    # Zusammengesetzte Indizes für die Keyset-Paginierung (owenr_id, id) und die Filter in GET /:
+    __table_args__ = (
+        Index("ix_todos_owenr_id_id", "owenr_id", "id"),
+        Index("ix_todos_owenr_id_complete_id", "owenr_id", "complete", "id"),
+        Index("ix_todos_owenr_id_priority_id", "owenr_id", "priority", "id"),
+    )
     
\ No newline at end of file
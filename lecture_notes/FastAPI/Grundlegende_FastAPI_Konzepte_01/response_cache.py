@@ -0,0 +1,60 @@
+import hashlib
+import time
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """Cache für bereits serialisierte Antworten der Lese-Routen, getrennt pro Benutzer.
+
+    Jeder Eintrag enthält den JSON-Body, einen ETag (Hash des Bodys), zusätzliche Header und die
+    Version der Daten, aus der er entstanden ist (z.B. `Users.todos_version`). Die Version liegt in
+    der Datenbank und wird von jedem Schreibzugriff erhöht; `get` liefert einen Eintrag nur, wenn er
+    zur aktuellen Version passt. So sieht auch ein anderer Worker-Prozess eine Änderung sofort, und
+    eine Antwort, die vor einem gleichzeitigen Schreibzugriff gelesen wurde, wird nie mehr ausgeliefert.
+    `invalidate(user_id)` gibt nur den Speicher im eigenen Prozess frei, `ttl` (Sekunden) begrenzt,
+    wie lange ungenutzte Einträge liegen bleiben.
+    """
+
+    def __init__(self, max_users: int = 10_000, max_entries_per_user: int = 32, ttl: float = 30.0):
+        self.max_users = max_users
+        self.max_entries_per_user = max_entries_per_user
+        self.ttl = ttl
+        self._users: OrderedDict[int, OrderedDict[str, tuple[str, bytes, dict, int, float]]] = OrderedDict()
+
+    def get(self, user_id: int, key: str, version: int) -> tuple[str, bytes, dict] | None:
+        entries = self._users.get(user_id)
+        if entries is None or key not in entries:
+            return None
+        etag, body, headers, entry_version, expires_at = entries[key]
+        if entry_version != version or expires_at <= time.monotonic():
+            del entries[key]
+            return None
+        entries.move_to_end(key)
+        self._users.move_to_end(user_id)
+        return etag, body, headers
+
+    def put(self, user_id: int, key: str, body: bytes, headers: dict | None = None,
+            version: int = 0) -> tuple[str, bytes, dict]:
+        """Speichert eine Antwort zur Version, die *vor* der Abfrage gelesen wurde."""
+        etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        headers = headers or {}
+        entries = self._users.setdefault(user_id, OrderedDict())
+        entries[key] = (etag, body, headers, version, time.monotonic() + self.ttl)
+        entries.move_to_end(key)
+        self._users.move_to_end(user_id)
+        if len(entries) > self.max_entries_per_user:
+            entries.popitem(last=False)
+        if len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+        return etag, body, headers
+
+    def invalidate(self, user_id: int):
+        self._users.pop(user_id, None)
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Prüft einen If-None-Match-Header (Liste von ETags, auch schwach mit W/ oder *)."""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
@@ -1,39 +1,111 @@
-from fastapi import APIRouter, Depends, HTTPException, Path
-from models import Todos
+import csv
+import io
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Path, Query
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from models import Todos, Users
 from database import SessionLocal
-from typing import Annotated
-from sqlalchemy.orm import Session
+from typing import Annotated, Literal
+from sqlalchemy import select, delete, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 from pydantic import BaseModel, Field
-from .auth import get_current_user
+from .auth import get_current_user, hashing_pool, revoke_user_tokens
+from .todos import bump_todos_version, response_cache, TodoResponse, TODO_FIELDS
 
 router = APIRouter(
     prefix="/admin",
     tags=["admin"]
 )
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
         
-db_dependency = Annotated[Session, Depends(get_db)]
+db_dependency = Annotated[AsyncSession, Depends(get_db)]
 user_dependency = Annotated[dict, Depends(get_current_user)]
 
-@router.get("/todo", status_code=status.HTTP_200_OK)
+# Anzahl Zeilen, die pro Durchlauf vom Datenbank-Cursor geholt werden:
+EXPORT_BATCH_SIZE = 1000
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+@router.get("/todo", status_code=status.HTTP_200_OK, response_model=list[TodoResponse])
 async def read_all(user: user_dependency, db: db_dependency):
     if user is None or user.get("user_role") != "admin":
         raise HTTPException(status_code=401, detail="Authentification failed.")
-    return db.query(Todos).all()
+    # Zeilen direkt als dicts an orjson geben, ohne ORM-Instanzen und jsonable_encoder:
+    result = await db.execute(select(*TODO_FIELDS.values()))
+    return ORJSONResponse([dict(row) for row in result.mappings()])
+
+@router.get("/todo/export", status_code=status.HTTP_200_OK)
+async def export_todos(user: user_dependency, format: Literal["ndjson", "csv"] = Query(default="ndjson")):
+    if user is None or user.get("user_role") != "admin":
+        raise HTTPException(status_code=401, detail="Authentification failed.")
+    return StreamingResponse(
+        stream_todos(format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="todos.{format}"'},
+    )
+
+async def stream_todos(format: str):
+    """Liefert alle Todos stapelweise als NDJSON- oder CSV-Text, ohne die Tabelle komplett zu laden."""
+    columns = list(TODO_FIELDS.values())
+    # Eigene Session: die Session aus get_db ist bereits geschlossen, während die Antwort gestreamt wird.
+    async with SessionLocal() as db:
+        # Server-seitiger Cursor + yield_per: es liegt immer nur ein Stapel im Speicher.
+        result = await db.stream(
+            select(*columns).order_by(Todos.id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        if format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(column.name for column in columns)
+            async for rows in result.partitions():
+                writer.writerows(rows)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue()
+        else:
+            async for rows in result.partitions():
+                yield b"".join(orjson.dumps(dict(row._mapping)) + b"\n" for row in rows)
 
 @router.delete("/todo/{todo_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_todo(user: user_dependency, db: db_dependency, todo_id: int = Path(gt=0)):
     if user is None or user.get("user_role") != "admin":
         raise HTTPException(status_code=404, detail="Aithentification Failed.")
-    todo_model = db.query(Todos).filter(Todos.id == todo_id).first()
-    if todo_model is None:
+    result = await db.execute(delete(Todos).filter(Todos.id == todo_id).returning(Todos.owenr_id))
+    deleted = result.first()
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Todo not found.")
-    db.query(Todos).filter(Todos.id == todo_id).delete()
-    db.commit()
\ No newline at end of file
+    await bump_todos_version(db, deleted.owenr_id)
+    await db.commit()
+    response_cache.invalidate(deleted.owenr_id)
+
+@router.put("/user/{user_id}/deactivate", status_code=status.HTTP_204_NO_CONTENT)
+async def deactivate_user(user: user_dependency, db: db_dependency, user_id: int = Path(gt=0)):
+    if user is None or user.get("user_role") != "admin":
+        raise HTTPException(status_code=401, detail="Authentification failed.")
+    # Die Sperre steht in der Benutzerzeile und gilt damit in allen Workern, auch nach einer Reaktivierung:
+    result = await db.execute(
+        update(Users).where(Users.id == user_id).values(is_active=False, **revoke_user_tokens(user_id))
+    )
+    if result.rowcount == 0:
+        raise HTTPException(status_code=404, detail="User not found.")
+    await db.commit()
+
+@router.put("/user/{user_id}/activate", status_code=status.HTTP_204_NO_CONTENT)
+async def activate_user(user: user_dependency, db: db_dependency, user_id: int = Path(gt=0)):
+    if user is None or user.get("user_role") != "admin":
+        raise HTTPException(status_code=401, detail="Authentification failed.")
+    result = await db.execute(update(Users).where(Users.id == user_id).values(is_active=True))
+    if result.rowcount == 0:
+        raise HTTPException(status_code=404, detail="User not found.")
+    await db.commit()
+
+@router.get("/metrics/hashing", status_code=status.HTTP_200_OK)
+async def read_hashing_metrics(user: user_dependency):
+    if user is None or user.get("user_role") != "admin":
+        raise HTTPException(status_code=401, detail="Authentification failed.")
+    return hashing_pool.stats()
\ No newline at end of file
@@ -3,8 +3,11 @@ from pydantic import BaseModel
 from models import Users
 from passlib.context import CryptContext
 from database import SessionLocal
+from hashing import HashingPool, HashingPoolFull
+from token_cache import TokenCache
 from typing import Annotated
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
 from jose import jwt, JWTError
@@ -17,8 +20,13 @@ router = APIRouter(
 
 SECRET_KEY = "MySecretKey"
 ALGORITHM = "HS256"
+ACCESS_TOKEN_EXPIRE_MINUTES = 20
 
 bcrypt_context  = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt läuft in einem eigenen, begrenzten Thread-Pool statt im Event Loop:
+hashing_pool = HashingPool(bcrypt_context, max_workers=4, max_queue=64)
+# Bereits verifizierte Tokens, damit nicht jede Anfrage erneut jwt.decode ausführt:
+token_cache = TokenCache(maxsize=10_000)
 oauth2_bearer = OAuth2PasswordBearer(tokenUrl="auth/token")
 
 class CreateUserRequest(BaseModel):
@@ -33,66 +41,94 @@ class Token(BaseModel):
     access_token: str
     token_type: str
     
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
         
-db_dependency = Annotated[Session, Depends(get_db)]
+db_dependency = Annotated[AsyncSession, Depends(get_db)]
 
-def authenticate_user(username: str, password: str, db: db_dependency):
-    user = db.query(Users).filter(Users.username == username).first()
-    if not user:
+async def authenticate_user(username: str, password: str, db: db_dependency):
+    result = await db.execute(select(Users).filter(Users.username == username))
+    user = result.scalars().first()
+    if not user or not user.is_active:
         return False
-    if not bcrypt_context.verify(password, user.hashed_password):
+    if not await hashing_pool.verify(password, user.hashed_password):
         return False
     return user
 
+def hashing_unavailable():
+    return HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Too many requests, try again later.",
+                         headers={"Retry-After": "1"})
+
 def create_access_token(username: str, user_id: int, role: str, expires_delta: timedelta):
     encode = {
         "sub": username,
         "id": user_id,
         "role": role
     }
-    expires = datetime.now(timezone.utc) + expires_delta
-    encode.update({"exp": expires})
+    issued = datetime.now(timezone.utc)
+    # "iat" mit Nachkommastellen, damit der Vergleich mit Users.tokens_valid_after nicht an der Sekunde hängt:
+    encode.update({"exp": issued + expires_delta, "iat": issued.timestamp()})
     return jwt.encode(encode, SECRET_KEY, algorithm=ALGORITHM)
 
-async def get_current_user(token: Annotated[str, Depends(oauth2_bearer)]):
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+async def get_current_user(token: Annotated[str, Depends(oauth2_bearer)], db: db_dependency):
+    claims = token_cache.get(token)
+    if claims is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate user.")
         username: str = payload.get("sub")
         user_id: int = payload.get("id")
         user_role: str = payload.get("role")
         if username is None or user_id is None:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate user.")
-        return {"username": username, "id": user_id, "user_role": user_role}
-    except JWTError:
+        claims = {"username": username, "id": user_id, "user_role": user_role, "iat": payload.get("iat", 0)}
+        token_cache.put(token, claims, payload["exp"])
+    # Sperren stehen in der Datenbank und gelten damit in allen Workern (siehe revoke_user_tokens):
+    result = await db.execute(select(Users.tokens_valid_after).filter(Users.id == claims["id"]))
+    valid_after = result.scalar()
+    if valid_after is None or claims["iat"] < valid_after:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate user.")
+    # Kopie zurückgeben, damit Aufrufer den Cache-Eintrag nicht verändern:
+    return dict(claims)
+
+def revoke_user_tokens(user_id: int):
+    """Alle bis jetzt ausgestellten Tokens des Benutzers ungültig machen (als Werte für update(Users)).
+
+    Gilt auch nach einer erneuten Aktivierung; danach muss sich der Benutzer neu anmelden.
+    """
+    token_cache.invalidate_user(user_id)
+    return {"tokens_valid_after": datetime.now(timezone.utc).timestamp()}
 
     
 @router.post("/", status_code=status.HTTP_201_CREATED)
 async def create_user(db: db_dependency, create_user_request: CreateUserRequest):
+    try:
+        hashed_password = await hashing_pool.hash(create_user_request.password)
+    except HashingPoolFull:
+        raise hashing_unavailable()
     create_user_model = Users(
         email=create_user_request.email,
         username=create_user_request.username,
         first_name=create_user_request.first_name,
         last_name=create_user_request.last_name,
         role=create_user_request.role,
-        hashed_password=bcrypt_context .hash(create_user_request.password),
+        hashed_password=hashed_password,
         is_active=True
     )
     
     db.add(create_user_model)
-    db.commit()
+    await db.commit()
     
 @router.post("/token", response_model=Token)
 async def login_for_access_token(form_data: Annotated[OAuth2PasswordRequestForm, Depends()], db: db_dependency):
-    user: Users = authenticate_user(form_data.username, form_data.password, db)
+    try:
+        user: Users = await authenticate_user(form_data.username, form_data.password, db)
+    except HashingPoolFull:
+        raise hashing_unavailable()
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate user.")
-    token = create_access_token(user.username, user.id, user.role, timedelta(minutes=20))
+    token = create_access_token(user.username, user.id, user.role, timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     
     return {"access_token": token, "token_type": "bearer"}
\ No newline at end of file
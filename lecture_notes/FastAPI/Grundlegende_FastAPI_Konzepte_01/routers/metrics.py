@@ -0,0 +1,37 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from starlette import status
+import instrumentation
+from .auth import hashing_pool, token_cache
+
+router = APIRouter(
+    tags=["metrics"]
+)
+
+@router.get("/metrics", status_code=status.HTTP_200_OK, response_class=PlainTextResponse)
+async def read_metrics():
+    lines = instrumentation.render_metrics()
+
+    hashing = hashing_pool.stats()
+    lines += [
+        "# TYPE hashing_pool_queue_depth gauge",
+        f"hashing_pool_queue_depth {hashing['queue_depth']}",
+        "# TYPE hashing_pool_in_flight gauge",
+        f"hashing_pool_in_flight {hashing['in_flight']}",
+        "# TYPE hashing_pool_rejected_total counter",
+        f"hashing_pool_rejected_total {hashing['rejected']}",
+        "# TYPE hashing_duration_seconds histogram",
+    ]
+    lines += [f'hashing_duration_seconds_bucket{{le="{bound}"}} {count}' for bound, count in hashing["latency_buckets"].items()]
+    lines += [
+        f'hashing_duration_seconds_bucket{{le="+Inf"}} {hashing["completed"]}',
+        f"hashing_duration_seconds_sum {hashing['latency_seconds_sum']}",
+        f"hashing_duration_seconds_count {hashing['completed']}",
+        "# TYPE token_cache_hits_total counter",
+        f"token_cache_hits_total {token_cache.hits}",
+        "# TYPE token_cache_misses_total counter",
+        f"token_cache_misses_total {token_cache.misses}",
+        "# TYPE token_cache_entries gauge",
+        f"token_cache_entries {len(token_cache)}",
+    ]
+    return "\n".join(lines) + "\n"
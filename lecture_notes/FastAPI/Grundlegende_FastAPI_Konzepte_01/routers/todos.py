@@ -1,44 +1,141 @@
-from fastapi import APIRouter, Depends, HTTPException, Path
-from models import Todos
+import orjson
+from fastapi import APIRouter, Body, Depends, HTTPException, Path, Query, Request, Response
+from models import Todos, Users
 from database import SessionLocal
-from typing import Annotated
-from sqlalchemy.orm import Session
+from response_cache import ResponseCache, etag_matches
+from typing import Annotated, Optional
+from sqlalchemy import select, insert, update, delete
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 from pydantic import BaseModel, Field
 from .auth import get_current_user
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
         
-db_dependency = Annotated[Session, Depends(get_db)]
+db_dependency = Annotated[AsyncSession, Depends(get_db)]
 user_dependency = Annotated[dict, Depends(get_current_user)]
 
+# Felder, die über ?fields= ausgewählt werden können (Standard: alle Spalten):
+TODO_FIELDS = {column.name: column for column in Todos.__table__.columns}
+# Maximale Anzahl Einträge pro Bulk-Anfrage:
+MAX_BULK_ITEMS = 1000
+
+# Serialisierte Antworten von GET / und GET /todo/{id}, gültig für eine Users.todos_version;
+# jede schreibende Route erhöht die Version (bump_todos_version) in ihrer Transaktion.
+response_cache = ResponseCache()
+
+async def read_todos_version(db: AsyncSession, user_id: int) -> int:
+    result = await db.execute(select(Users.todos_version).filter(Users.id == user_id))
+    return result.scalar() or 0
+
+async def bump_todos_version(db: AsyncSession, user_id: int):
+    """Vor dem Commit aufrufen: macht die Cache-Einträge des Benutzers in allen Workern ungültig."""
+    await db.execute(
+        update(Users)
+        .filter(Users.id == user_id)
+        .values(todos_version=Users.todos_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+def cache_key(request: Request) -> str:
+    return f"{request.url.path}?{request.url.query}"
+
+def cached_response(request: Request, cached: tuple[str, bytes, dict]) -> Response:
+    etag, body, headers = cached
+    # Der Client muss immer nachfragen, bekommt bei unveränderten Daten aber nur ein 304 ohne Body:
+    cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers)
+    return Response(body, media_type="application/json", headers={**cache_headers, **headers})
+
 class TodoRequest(BaseModel):
     title: str = Field(min_length=3)
     description: str = Field(min_length=3, max_length=100)
     priority: int = Field(gt=0, lt=6)
     complete: bool
+
+class TodoResponse(BaseModel):
+    id: int
+    title: str
+    description: str
+    priority: int
+    complete: bool
+    owenr_id: int
+
+class TodoBulkUpdateRequest(TodoRequest):
+    id: int = Field(gt=0)
+
+class TodoBulkResult(BaseModel):
+    id: Optional[int]
+    status: int
     
-@router.get("/", status_code=status.HTTP_200_OK)
-async def read_all(user: user_dependency, db: db_dependency):
+@router.get("/", status_code=status.HTTP_200_OK, response_model=list[TodoResponse],
+            description="With fields= only the selected fields (plus id) are returned.")
+async def read_all(user: user_dependency, db: db_dependency, request: Request,
+                   limit: int = Query(default=100, gt=0, le=1000),
+                   after: Optional[int] = Query(default=None, gt=0, description="Cursor: id of the last todo of the previous page"),
+                   fields: Optional[str] = Query(default=None, description="Comma-separated list of fields, e.g. id,title"),
+                   complete: Optional[bool] = None,
+                   priority: Optional[int] = Query(default=None, gt=0, lt=6)):
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentification Failed")
-    return db.query(Todos).filter(Todos.owenr_id == user.get("id")).all()
 
-@router.get("/todo/{todo_id}", status_code=status.HTTP_200_OK)
-async def read_todo(user: user_dependency, db: db_dependency, todo_id: int = Path(gt=0)):
+    # Die Version vor der Abfrage lesen: ein gleichzeitiger Schreibzugriff erhöht sie, der Eintrag gilt dann nicht mehr:
+    version = await read_todos_version(db, user.get("id"))
+    cached = response_cache.get(user.get("id"), cache_key(request), version)
+    if cached is not None:
+        return cached_response(request, cached)
+
+    if fields is None:
+        names = list(TODO_FIELDS)
+    else:
+        names = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = [name for name in names if name not in TODO_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"Unknown fields: {', '.join(unknown)}")
+    # Nur Spalten laden (keine ORM-Instanzen); id wird immer mitgeliefert, da sie der Cursor ist:
+    query = select(*(TODO_FIELDS[name] for name in dict.fromkeys(["id", *names])))
+
+    # Keyset-Paginierung auf (owenr_id, id): nutzt den Index statt OFFSET:
+    query = query.filter(Todos.owenr_id == user.get("id"))
+    if after is not None:
+        query = query.filter(Todos.id > after)
+    if complete is not None:
+        query = query.filter(Todos.complete == complete)
+    if priority is not None:
+        query = query.filter(Todos.priority == priority)
+    # Eine Zeile mehr laden, um zu erkennen, ob es eine weitere Seite gibt:
+    query = query.order_by(Todos.id).limit(limit + 1)
+
+    result = await db.execute(query)
+    todos = [dict(row) for row in result.mappings()]
+    headers = {}
+    if len(todos) > limit:
+        todos = todos[:limit]
+        headers["X-Next-Cursor"] = str(todos[-1]["id"])
+    body = orjson.dumps(todos)
+    return cached_response(request, response_cache.put(user.get("id"), cache_key(request), body, headers, version=version))
+
+@router.get("/todo/{todo_id}", status_code=status.HTTP_200_OK, response_model=TodoResponse)
+async def read_todo(user: user_dependency, db: db_dependency, request: Request, todo_id: int = Path(gt=0)):
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentification Failed")
-    
-    todo_model = db.query(Todos).filter(Todos.id == todo_id).filter(Todos.owenr_id == user.get("id")).first()
-    if todo_model is not None:
-        return todo_model
+
+    # Die Version vor der Abfrage lesen: ein gleichzeitiger Schreibzugriff erhöht sie, der Eintrag gilt dann nicht mehr:
+    version = await read_todos_version(db, user.get("id"))
+    cached = response_cache.get(user.get("id"), cache_key(request), version)
+    if cached is not None:
+        return cached_response(request, cached)
+
+    result = await db.execute(select(*TODO_FIELDS.values()).filter(Todos.id == todo_id).filter(Todos.owenr_id == user.get("id")))
+    todo = result.mappings().first()
+    if todo is not None:
+        body = orjson.dumps(dict(todo))
+        return cached_response(request, response_cache.put(user.get("id"), cache_key(request), body, version=version))
     raise HTTPException(status_code=404, detail="Todo not found.")
 
 @router.post("/todo", status_code=status.HTTP_201_CREATED)
@@ -47,32 +144,103 @@ async def create_todo(user: user_dependency, db: db_dependency, todo_request: To
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentification Failed")
     todo_model = Todos(**todo_request.model_dump(), owenr_id=user.get("id"))
     db.add(todo_model)
-    db.commit()
+    await bump_todos_version(db, user.get("id"))
+    await db.commit()
+    response_cache.invalidate(user.get("id"))
     
+# Die Bulk-Routen müssen vor /todo/{todo_id} stehen, sonst würde "bulk" als todo_id gelesen.
+@router.post("/todo/bulk", status_code=status.HTTP_201_CREATED, response_model=list[TodoBulkResult])
+async def create_todos(user: user_dependency, db: db_dependency,
+                       todo_requests: Annotated[list[TodoRequest], Body(min_length=1, max_length=MAX_BULK_ITEMS)]):
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentification Failed")
+    # Ein INSERT mit allen Zeilen (executemany/insertmanyvalues) in einer Transaktion:
+    result = await db.execute(
+        insert(Todos).returning(Todos.id, sort_by_parameter_order=True),
+        [{**todo_request.model_dump(), "owenr_id": user.get("id")} for todo_request in todo_requests],
+    )
+    ids = result.scalars().all()
+    await bump_todos_version(db, user.get("id"))
+    await db.commit()
+    response_cache.invalidate(user.get("id"))
+    return [{"id": todo_id, "status": status.HTTP_201_CREATED} for todo_id in ids]
+
+@router.put("/todo/bulk", status_code=status.HTTP_200_OK, response_model=list[TodoBulkResult])
+async def update_todos(user: user_dependency, db: db_dependency,
+                       todo_requests: Annotated[list[TodoBulkUpdateRequest], Body(min_length=1, max_length=MAX_BULK_ITEMS)]):
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentification Failed")
+    # Doppelte ids: der letzte Eintrag gewinnt, jede id bekommt genau ein Ergebnis:
+    todo_requests = list({todo_request.id: todo_request for todo_request in todo_requests}.values())
+    # Eine Abfrage für die Besitzprüfung aller Einträge statt einer pro Eintrag (für die Status-Codes):
+    result = await db.execute(
+        select(Todos.id)
+        .filter(Todos.id.in_([todo_request.id for todo_request in todo_requests]))
+        .filter(Todos.owenr_id == user.get("id"))
+    )
+    owned_ids = set(result.scalars().all())
+    values = [todo_request.model_dump() for todo_request in todo_requests if todo_request.id in owned_ids]
+    if values:
+        # ORM-Bulk-UPDATE nach Primärschlüssel, als executemany in derselben Transaktion;
+        # die Besitzprüfung steht zusätzlich in der WHERE-Klausel jeder Zeile:
+        await db.execute(
+            update(Todos).where(Todos.owenr_id == user.get("id")).execution_options(synchronize_session=None), values
+        )
+    await bump_todos_version(db, user.get("id"))
+    await db.commit()
+    response_cache.invalidate(user.get("id"))
+    return [{"id": todo_request.id, "status": status.HTTP_204_NO_CONTENT if todo_request.id in owned_ids else status.HTTP_404_NOT_FOUND}
+            for todo_request in todo_requests]
+
+@router.delete("/todo/bulk", status_code=status.HTTP_200_OK, response_model=list[TodoBulkResult])
+async def delete_todos(user: user_dependency, db: db_dependency,
+                       todo_ids: Annotated[list[Annotated[int, Field(gt=0)]], Body(min_length=1, max_length=MAX_BULK_ITEMS)]):
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentification Failed")
+    # Doppelte ids nur einmal löschen und melden:
+    todo_ids = list(dict.fromkeys(todo_ids))
+    result = await db.execute(
+        delete(Todos).filter(Todos.id.in_(todo_ids)).filter(Todos.owenr_id == user.get("id")).returning(Todos.id)
+    )
+    deleted_ids = set(result.scalars().all())
+    await bump_todos_version(db, user.get("id"))
+    await db.commit()
+    response_cache.invalidate(user.get("id"))
+    return [{"id": todo_id, "status": status.HTTP_204_NO_CONTENT if todo_id in deleted_ids else status.HTTP_404_NOT_FOUND}
+            for todo_id in todo_ids]
+
 @router.put("/todo/{todo_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def update_todo(user: user_dependency, db: db_dependency, todo_request: TodoRequest, todo_id: int = Path(gt=0)):
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentification Failed")
     
-    todo_model = db.query(Todos).filter(Todos.id == todo_id).filter(Todos.owenr_id == user.get("id")).first()
-    if todo_model is None:
+    # Ein einziges UPDATE mit Besitzprüfung in der WHERE-Klausel; 404 anhand der Zeilenanzahl:
+    result = await db.execute(
+        update(Todos)
+        .filter(Todos.id == todo_id)
+        .filter(Todos.owenr_id == user.get("id"))
+        .values(**todo_request.model_dump())
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
         raise HTTPException(status_code=404, detail="Todo not found.")
-    
-    todo_model.title = todo_request.title
-    todo_model.description = todo_request.description
-    todo_model.priority = todo_request.priority
-    todo_model.complete = todo_request.complete
-    
-    db.add(todo_model)
-    db.commit()
+    await bump_todos_version(db, user.get("id"))
+    await db.commit()
+    response_cache.invalidate(user.get("id"))
 
 @router.delete("/todo/{todo_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_todo(user: user_dependency, db: db_dependency, todo_id: int = Path(gt=0)):
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentification Failed")
     
-    todo_model = db.query(Todos).filter(Todos.id == todo_id).filter(Todos.owenr_id == user.get("id")).first()
-    if todo_model is None:
+    result = await db.execute(
+        delete(Todos)
+        .filter(Todos.id == todo_id)
+        .filter(Todos.owenr_id == user.get("id"))
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
         raise HTTPException(status_code=404, detail="Todo not found.")
-    db.query(Todos).filter(Todos.id == todo_id).filter(Todos.owenr_id == user.get("id")).delete()
-    db.commit()
\ No newline at end of file
+    await bump_todos_version(db, user.get("id"))
+    await db.commit()
+    response_cache.invalidate(user.get("id"))
\ No newline at end of file
@@ -0,0 +1,68 @@
+import hashlib
+import time
+from collections import OrderedDict
+
+
+class TokenCache:
+    """Begrenzter LRU/TTL-Cache für bereits verifizierte JWTs.
+
+    Schlüssel ist der SHA-256-Digest des Tokens (das Token selbst wird nicht gespeichert),
+    Wert sind die dekodierten Claims. Ein Eintrag verfällt spätestens zum `exp` des Tokens,
+    bei mehr als `maxsize` Einträgen wird der am längsten nicht genutzte verdrängt.
+    Ob ein Token gesperrt ist, entscheidet nicht der Cache, sondern `Users.tokens_valid_after`
+    (siehe get_current_user), damit die Sperre in allen Workern gilt.
+    """
+
+    def __init__(self, maxsize: int = 10_000):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[bytes, tuple[dict, float]] = OrderedDict()
+        self._keys_by_user: dict[int, set[bytes]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> dict | None:
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        claims, expires_at = entry
+        if expires_at <= time.time():
+            self._remove(key, claims["id"])
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return claims
+
+    def put(self, token: str, claims: dict, expires_at: float):
+        key = self._key(token)
+        self._entries[key] = (claims, expires_at)
+        self._entries.move_to_end(key)
+        self._keys_by_user.setdefault(claims["id"], set()).add(key)
+        while len(self._entries) > self.maxsize:
+            old_key, (old_claims, _) = self._entries.popitem(last=False)
+            self._discard_user_key(old_claims["id"], old_key)
+
+    def invalidate_user(self, user_id: int):
+        """Entfernt alle Einträge eines Benutzers (nur im eigenen Prozess)."""
+        for key in self._keys_by_user.pop(user_id, set()):
+            self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, key: bytes, user_id: int):
+        self._entries.pop(key, None)
+        self._discard_user_key(user_id, key)
+
+    def _discard_user_key(self, user_id: int, key: bytes):
+        keys = self._keys_by_user.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[user_id]
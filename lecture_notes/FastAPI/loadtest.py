@@ -0,0 +1,305 @@
+"""Lasttest für die FastAPI-Apps (Todo-App und Books-APIs).
+
+Die App läuft entweder in-process (httpx + ASGITransport) oder wird über --url gegen einen
+lokal gestarteten uvicorn getestet. Ergebnisse (RPS, p50/p95/p99 pro Route) werden als JSON
+gespeichert und können mit `compare` gegen einen früheren Lauf geprüft werden.
+
+Beispiele (aus diesem Verzeichnis):
+    python loadtest.py todo --users 10 --todos 200 --requests 5000 --concurrency 32 --out todo.json
+    python loadtest.py books --requests 5000 --out books.json
+    python loadtest.py books-intro --url http://127.0.0.1:8000
+    python loadtest.py compare todo_alt.json todo.json --threshold 0.1
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+
+import httpx
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIRS = {
+    "todo": os.path.join(BASE_DIR, "Grundlegende_FastAPI_Konzepte_01"),
+    "books": os.path.join(BASE_DIR, "Grundlegende_FastAPI_Konzepte"),
+    "books-intro": os.path.join(BASE_DIR, "Einführung_in_FastAPI"),
+}
+
+
+def percentile(values: list, p: float) -> float:
+    """Berechnet das p-Perzentil (0-100) einer Liste von Messwerten."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(p / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+@asynccontextmanager
+async def open_client(scenario: str, url: str | None):
+    """Liefert einen httpx-Client: gegen --url oder gegen die in-process gestartete App."""
+    if url is not None:
+        async with httpx.AsyncClient(base_url=url, timeout=30) as client:
+            yield client
+        return
+
+    sys.path.insert(0, APP_DIRS[scenario])
+    with tempfile.TemporaryDirectory() as tmp:
+        if scenario == "todo":
+            # Frische Datenbank für jeden Lauf; muss vor dem Import von main gesetzt sein:
+            os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(tmp, 'todoapps.db')}"
+            from main import app
+        else:
+            from books import app
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=30) as client:
+                yield client
+
+
+class Recorder:
+    """Sammelt Latenzen und Fehler pro Route (Route-Template, z.B. "GET /todo/{id}")."""
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+
+    async def request(self, client: httpx.AsyncClient, route: str, method: str, path: str, **kwargs) -> httpx.Response:
+        start = time.perf_counter()
+        response = await client.request(method, path, **kwargs)
+        self.latencies.setdefault(route, []).append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            self.errors[route] = self.errors.get(route, 0) + 1
+        return response
+
+    def report(self, elapsed: float) -> dict:
+        routes = {}
+        for route, latencies in sorted(self.latencies.items()):
+            routes[route] = {
+                "requests": len(latencies),
+                "errors": self.errors.get(route, 0),
+                "rps": len(latencies) / elapsed,
+                "p50_ms": percentile(latencies, 50) * 1000,
+                "p95_ms": percentile(latencies, 95) * 1000,
+                "p99_ms": percentile(latencies, 99) * 1000,
+            }
+        total = sum(len(latencies) for latencies in self.latencies.values())
+        return {"elapsed_s": elapsed, "requests": total, "rps": total / elapsed, "routes": routes}
+
+
+def weighted_choice(rng: random.Random, workload: list) -> tuple:
+    return rng.choices(workload, weights=[weight for weight, *_ in workload])[0]
+
+
+# --- Todo-App ---------------------------------------------------------------------------------
+
+async def seed_todo(client: httpx.AsyncClient, users: int, todos: int) -> list[dict]:
+    """Legt Benutzer an, holt Tokens über /auth/token und legt Todos über /todo/bulk an."""
+    suffix = f"{time.time_ns()}"
+    sessions = []
+    for index in range(users):
+        username = f"load{index}_{suffix}"
+        await client.post("/auth/", json={
+            "username": username, "email": f"{username}@example.com", "first_name": "Load",
+            "last_name": "Test", "password": "loadtest", "role": "user",
+        })
+        response = await client.post("/auth/token", data={"username": username, "password": "loadtest"})
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        ids = []
+        for offset in range(0, todos, 1000):
+            batch = [{"title": f"Todo {number}", "description": "Load test", "priority": number % 5 + 1,
+                      "complete": number % 2 == 0} for number in range(offset, min(todos, offset + 1000))]
+            response = await client.post("/todo/bulk", json=batch, headers=headers)
+            response.raise_for_status()
+            ids += [item["id"] for item in response.json()]
+        sessions.append({"headers": headers, "ids": ids})
+    return sessions
+
+
+async def todo_step(client, recorder: Recorder, rng: random.Random, sessions: list[dict]):
+    session = rng.choice(sessions)
+    headers, ids = session["headers"], session["ids"]
+    todo = {"title": "Load todo", "description": "Load test", "priority": rng.randint(1, 5), "complete": rng.random() < 0.5}
+    _, action = weighted_choice(rng, TODO_WORKLOAD)
+    if action == "list":
+        await recorder.request(client, "GET /", "GET", "/", params={"limit": 100}, headers=headers)
+    elif action == "read" and ids:
+        await recorder.request(client, "GET /todo/{id}", "GET", f"/todo/{rng.choice(ids)}", headers=headers)
+    elif action == "update" and ids:
+        await recorder.request(client, "PUT /todo/{id}", "PUT", f"/todo/{rng.choice(ids)}", json=todo, headers=headers)
+    elif action == "delete" and ids:
+        todo_id = ids.pop(rng.randrange(len(ids)))
+        await recorder.request(client, "DELETE /todo/{id}", "DELETE", f"/todo/{todo_id}", headers=headers)
+    else:
+        await recorder.request(client, "POST /todo", "POST", "/todo", json=todo, headers=headers)
+
+
+TODO_WORKLOAD = [(50, "list"), (25, "read"), (10, "create"), (10, "update"), (5, "delete")]
+
+
+# --- Books-APIs ---------------------------------------------------------------------------------
+
+async def books_step(client, recorder: Recorder, rng: random.Random, state: dict):
+    book = {"title": f"Load book {rng.randint(1, 1000)}", "author": "Load", "description": "Load test",
+            "rating": rng.randint(1, 5), "published_date": rng.randint(2000, 2030)}
+    _, action = weighted_choice(rng, BOOKS_WORKLOAD)
+    if action == "list":
+        await recorder.request(client, "GET /books", "GET", "/books")
+    elif action == "read":
+        await recorder.request(client, "GET /books/{id}", "GET", f"/books/{rng.randint(1, state['max_id'])}")
+    elif action == "by_date":
+        await recorder.request(client, "GET /books/publish/", "GET", "/books/publish/", params={"published_date": book["published_date"]})
+    elif action == "by_rating":
+        await recorder.request(client, "GET /books/", "GET", "/books/", params={"book_rating": book["rating"]})
+    elif action == "search":
+        await recorder.request(client, "GET /books/search", "GET", "/books/search", params={"q": rng.choice(["load", "book 1", "fast", "hp"])})
+    elif action == "update":
+        await recorder.request(client, "PUT /books/update_book", "PUT", "/books/update_book", json={**book, "id": rng.randint(1, 6)})
+    else:
+        await recorder.request(client, "POST /create-book", "POST", "/create-book", json=book)
+        state["max_id"] += 1
+
+
+BOOKS_WORKLOAD = [(20, "list"), (35, "read"), (15, "by_date"), (15, "by_rating"), (10, "search"), (10, "create"), (5, "update")]
+
+
+async def books_intro_step(client, recorder: Recorder, rng: random.Random, state: dict):
+    number = rng.randint(1, 5)
+    title = ["Title One", "Title Two", "Title Three", "Title Four", "Title Five"][number - 1]
+    _, action = weighted_choice(rng, BOOKS_INTRO_WORKLOAD)
+    if action == "list":
+        await recorder.request(client, "GET /books", "GET", "/books")
+    elif action == "by_title":
+        await recorder.request(client, "GET /books/title/{title}", "GET", f"/books/title/{title}")
+    elif action == "by_category":
+        await recorder.request(client, "GET /books/category/", "GET", "/books/category/", params={"category": rng.choice(["science", "math", "history"])})
+    elif action == "update":
+        await recorder.request(client, "PUT /books/update_book", "PUT", "/books/update_book",
+                               json={"title": title, "author": f"Author {number}", "category": "science"})
+    else:
+        await recorder.request(client, "POST /books/create_book", "POST", "/books/create_book",
+                               json={"title": f"Load {rng.randint(1, 10**9)}", "author": "Load", "category": "math"})
+
+
+BOOKS_INTRO_WORKLOAD = [(20, "list"), (40, "by_title"), (25, "by_category"), (10, "create"), (5, "update")]
+
+
+# --- Ablauf --------------------------------------------------------------------------------------
+
+async def run_scenario(args) -> dict:
+    rng = random.Random(args.seed)
+    recorder = Recorder()
+    async with open_client(args.scenario, args.url) as client:
+        if args.scenario == "todo":
+            state = await seed_todo(client, args.users, args.todos)
+            step = todo_step
+        elif args.scenario == "books":
+            state = {"max_id": 6}
+            step = books_step
+        else:
+            state = {}
+            step = books_intro_step
+
+        remaining = args.requests
+
+        async def worker():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                await step(client, recorder, rng, state)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "scenario": args.scenario,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git_revision": git_revision(),
+        "target": args.url or "in-process",
+        "settings": {"requests": args.requests, "concurrency": args.concurrency, "users": args.users,
+                     "todos": args.todos, "seed": args.seed},
+        **recorder.report(elapsed),
+    }
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(result: dict):
+    print(f"{result['scenario']} ({result['target']}): {result['requests']} Anfragen in "
+          f"{result['elapsed_s']:.2f}s = {result['rps']:.0f} RPS")
+    print(f"{'Route':<32}{'Anz.':>7}{'Fehler':>8}{'RPS':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for route, stats in result["routes"].items():
+        print(f"{route:<32}{stats['requests']:>7}{stats['errors']:>8}{stats['rps']:>9.1f}"
+              f"{stats['p50_ms']:>9.2f}{stats['p95_ms']:>9.2f}{stats['p99_ms']:>9.2f}")
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[str]:
+    """Meldet Routen, deren p95 um mehr als `threshold` gestiegen oder deren RPS gefallen ist."""
+    regressions = []
+    for route, stats in current["routes"].items():
+        old = baseline["routes"].get(route)
+        if old is None:
+            continue
+        if old["p95_ms"] > 0 and stats["p95_ms"] > old["p95_ms"] * (1 + threshold):
+            regressions.append(f"{route}: p95 {old['p95_ms']:.2f} ms -> {stats['p95_ms']:.2f} ms")
+        if stats["rps"] < old["rps"] * (1 - threshold):
+            regressions.append(f"{route}: RPS {old['rps']:.1f} -> {stats['rps']:.1f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lasttest für die FastAPI-Apps")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    for scenario in APP_DIRS:
+        run = subparsers.add_parser(scenario, help=f"Lasttest der App in {os.path.basename(APP_DIRS[scenario])}")
+        run.add_argument("--url", help="Gegen einen laufenden Server testen statt in-process")
+        run.add_argument("--requests", type=int, default=2000)
+        run.add_argument("--concurrency", type=int, default=16)
+        run.add_argument("--users", type=int, default=5, help="nur todo: Anzahl Benutzer")
+        run.add_argument("--todos", type=int, default=200, help="nur todo: Todos pro Benutzer")
+        run.add_argument("--seed", type=int, default=42)
+        run.add_argument("--out", help="Ergebnis als JSON speichern")
+        run.set_defaults(scenario=scenario)
+
+    compare_parser = subparsers.add_parser("compare", help="Zwei gespeicherte Läufe vergleichen")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.1, help="erlaubte Verschlechterung (0.1 = 10%%)")
+
+    args = parser.parse_args()
+    if args.command == "compare":
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        with open(args.current) as file:
+            current = json.load(file)
+        regressions = compare(baseline, current, args.threshold)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if not regressions:
+            print("Keine Regressionen gefunden.")
+        sys.exit(1 if regressions else 0)
+
+    result = asyncio.run(run_scenario(args))
+    print_report(result)
+    if args.out:
+        with open(args.out, "w") as file:
+            json.dump(result, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+"""Benchmarks für die Wetter-Skripte, gegen den lokalen Mock (mock_server.py) statt der echten APIs.
+
+Aufruf aus diesem Verzeichnis, z.B.:
+    python benchmark.py concurrency --locations 200 --latency 0.05
+    python benchmark.py batch --locations 1000
+    python benchmark.py geocode --locations 100 --nominatim-interval 0.05
+    python benchmark.py session --requests 500 --fail-rate 0.1
+    python benchmark.py db --rows 5000
+    python benchmark.py query --rows 200000 --locations 200
+    python benchmark.py collector --locations 2000 --rounds 3 --fail-rate 0.1
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import requests
+
+import http_client
+import open_meteo
+import weather_db
+from mock_server import start_mock_server
+
+
+def make_locations(count: int) -> list:
+    return [{"latitude": round(-60 + (i * 0.37) % 120, 2), "longitude": round(-170 + (i * 0.73) % 340, 2)} for i in range(count)]
+
+
+@contextlib.contextmanager
+def mock_environment(latency: float, nominatim_interval: float = 0.0, fail_rate: float = 0.0):
+    """Startet den Mock, leitet die Basis-URLs darauf um und arbeitet in einem temporären Verzeichnis
+    (wetter.db entsteht dort). Die Skript-Module werden erst danach importiert, weil sie die
+    Umgebungsvariablen beim Import lesen."""
+    server, url = start_mock_server(latency=latency, fail_rate=fail_rate)
+    os.environ.update(OPEN_METEO_URL=url, NOMINATIM_URL=url, NOMINATIM_MIN_INTERVAL=str(nominatim_interval))
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            yield server
+        finally:
+            os.chdir(cwd)
+            server.shutdown()
+
+
+def bench_concurrency(args):
+    with mock_environment(args.latency) as server:
+        import requests_01
+
+        requests_01.create_database()
+        locations = make_locations(args.locations)
+        print(f"{'Worker':>8}{'Sekunden':>10}{'Standorte/s':>14}{'Anfragen':>10}")
+        for workers in args.workers:
+            server.requests.clear()
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                results = requests_01.get_temperature(locations, max_workers=workers)
+            elapsed = time.perf_counter() - start
+            assert [result["latitude"] for result in results] == [location["latitude"] for location in locations]
+            print(f"{workers:>8}{elapsed:>10.2f}{len(results) / elapsed:>14.1f}{sum(server.requests.values()):>10}")
+
+
+def bench_batch(args):
+    """Nur Open-Meteo: eine Anfrage pro Koordinate vs. gebündelte Anfragen."""
+    with mock_environment(args.latency) as server:
+        base_url = os.environ["OPEN_METEO_URL"] + "v1/forecast"
+        coordinates = [(location["latitude"], location["longitude"]) for location in make_locations(args.locations)]
+        batch_size = open_meteo.MAX_LOCATIONS_PER_REQUEST
+        print(f"{'Variante':<24}{'Sekunden':>10}{'Anfragen':>10}{'Fehler':>8}")
+        for name, per_request, workers in (
+            ("einzeln, sequentiell", 1, 1),
+            ("einzeln, 8 Threads", 1, 8),
+            ("gebündelt, sequentiell", batch_size, 1),
+            ("gebündelt, 8 Threads", batch_size, 8),
+        ):
+            open_meteo.MAX_LOCATIONS_PER_REQUEST = per_request
+            server.requests.clear()
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                weather = open_meteo.fetch_current_weather(requests.get, base_url, coordinates, map_func=executor.map)
+            elapsed = time.perf_counter() - start
+            print(f"{name:<24}{elapsed:>10.2f}{sum(server.requests.values()):>10}{weather.count(None):>8}")
+        open_meteo.MAX_LOCATIONS_PER_REQUEST = batch_size
+
+
+def bench_geocode(args):
+    """get_temperature mehrmals hintereinander: Nominatim-Anfragen und Dauer mit leerem/gefülltem Cache."""
+    with mock_environment(args.latency, args.nominatim_interval) as server:
+        import requests_01
+
+        requests_01.create_database()
+        locations = make_locations(args.locations)
+        print(f"{'Durchlauf':<12}{'Sekunden':>10}{'Nominatim':>11}{'Quote gesamt':>14}")
+        for run in range(1, args.runs + 1):
+            server.requests.clear()
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                requests_01.get_temperature(locations)
+            elapsed = time.perf_counter() - start
+            hit_rate = requests_01.GEOCODE_CACHE.stats()["hit_rate"]
+            print(f"{run:<12}{elapsed:>10.2f}{server.requests.get('/reverse', 0):>11}{hit_rate:>14.0%}")
+
+
+def bench_session(args):
+    """Wiederholte Einzelanfragen: requests.get (neue Verbindung pro Aufruf) vs. gemeinsame Session."""
+    with mock_environment(args.latency, fail_rate=args.fail_rate) as server:
+        urls = [
+            f"{os.environ['OPEN_METEO_URL']}v1/forecast?latitude={location['latitude']}&longitude={location['longitude']}&current_weather=true"
+            for location in make_locations(args.requests)
+        ]
+
+        def fetch(get, url):
+            try:
+                response = get(url, timeout=5)
+                response.raise_for_status()
+                return True
+            except requests.exceptions.RequestException:
+                return False
+
+        print(f"{'Variante':<26}{'Threads':>8}{'p50 ms':>9}{'p95 ms':>9}{'Anfragen/s':>12}{'Verbindungen':>14}{'Fehler':>8}")
+        for name, get in (
+            ("requests.get", requests.get),
+            ("Session ohne Retry", http_client.create_session(max_retries=0).get),
+            ("Session mit Retry", http_client.create_session(backoff_factor=0.01, backoff_jitter=0.01).get),
+        ):
+            for workers in (1, args.workers):
+                server.connections = 0
+                latencies = []
+
+                def timed_fetch(url):
+                    start = time.perf_counter()
+                    ok = fetch(get, url)
+                    latencies.append(time.perf_counter() - start)
+                    return ok
+
+                start = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    results = list(executor.map(timed_fetch, urls))
+                elapsed = time.perf_counter() - start
+                latencies.sort()
+                p50 = latencies[len(latencies) // 2] * 1000
+                p95 = latencies[int(len(latencies) * 0.95)] * 1000
+                print(f"{name:<26}{workers:>8}{p50:>9.2f}{p95:>9.2f}{len(urls) / elapsed:>12.0f}{server.connections:>14}{results.count(False):>8}")
+
+
+def save_per_row(path: str, city, latitude, longitude, temperature):
+    """Der bisherige Weg: neue Verbindung und commit für jede Zeile."""
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute(weather_db.INSERT, (city, latitude, longitude, temperature, weather_db.utc_timestamp()))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def bench_db(args):
+    """Schreibrate in wetter.db: Verbindung + commit pro Zeile vs. WeatherDatabase (WAL, gepuffert)."""
+    locations = make_locations(args.locations or args.rows)
+    readings = [(f"Ort {i % len(locations)}", locations[i % len(locations)]["latitude"], locations[i % len(locations)]["longitude"], 20.5) for i in range(args.rows)]
+    with tempfile.TemporaryDirectory() as workdir:
+        print(f"{'Variante':<34}{'Sekunden':>10}{'Zeilen/s':>12}{'Transaktionen':>15}")
+
+        def run(name, path, save, workers=1, finish=None):
+            start = time.perf_counter()
+            if workers == 1:
+                for reading in readings:
+                    save(*reading)
+            else:
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    list(executor.map(lambda reading: save(*reading), readings))
+            transactions = finish() if finish else len(readings)
+            elapsed = time.perf_counter() - start
+            with sqlite3.connect(path) as conn:
+                assert conn.execute("SELECT COUNT(*) FROM wetterdaten").fetchone()[0] == len(readings)
+            print(f"{name:<34}{elapsed:>10.2f}{len(readings) / elapsed:>12.0f}{transactions:>15}")
+
+        path = os.path.join(workdir, "legacy.db")
+        weather_db.connect(path).close()
+        # Der alte Weg lief ohne WAL (Rollback-Journal):
+        with sqlite3.connect(path) as conn:
+            conn.execute("PRAGMA journal_mode=DELETE")
+        run("connect + commit je Zeile", path, lambda *reading: save_per_row(path, *reading))
+
+        for name, batch_size, workers in (
+            ("eine Verbindung, commit je Zeile", 1, 1),
+            (f"gepuffert ({args.batch_size})", args.batch_size, 1),
+            (f"gepuffert ({args.batch_size}), {args.workers} Threads", args.batch_size, args.workers),
+        ):
+            path = os.path.join(workdir, f"{batch_size}-{workers}.db")
+            database = weather_db.WeatherDatabase(path, batch_size=batch_size, max_delay=60)
+
+            def finish():
+                database.close()
+                return database.flushes
+
+            run(name, path, database.save_weather_data, workers, finish)
+
+
+def bench_query(args):
+    """Dashboard-Abfragen: alte Tabelle ohne Indizes (Aggregation über Rohdaten) vs. Indizes und Rollups."""
+    locations = [(f"Ort {i}", location["latitude"], location["longitude"]) for i, location in enumerate(make_locations(args.locations))]
+    start = datetime(2025, 1, 1)
+    # Gleichmäßig verteilte Messwerte über args.days Tage:
+    step = timedelta(days=args.days) / (args.rows // len(locations))
+    readings = [
+        (*locations[i % len(locations)], round(-10 + (i * 7919) % 400 / 10, 1), start + (i // len(locations)) * step)
+        for i in range(args.rows)
+    ]
+    city, latitude, longitude = locations[0]
+    day_start, day_end = start + timedelta(days=args.days // 2), start + timedelta(days=args.days // 2 + 1)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        legacy = sqlite3.connect(os.path.join(workdir, "legacy.db"))
+        legacy.execute("CREATE TABLE wetterdaten (id INTEGER PRIMARY KEY AUTOINCREMENT, city TEXT, latitude REAL, longitude REAL, temperature REAL, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)")
+        legacy.executemany(weather_db.INSERT, [(*reading[:4], weather_db.to_timestamp(reading[4])) for reading in readings])
+        legacy.commit()
+
+        database = weather_db.WeatherDatabase(os.path.join(workdir, "wetter.db"), batch_size=len(readings))
+        ingest_start = time.perf_counter()
+        database.save_many(readings)
+        print(f"Einfügen mit Indizes und Rollups: {len(readings) / (time.perf_counter() - ingest_start):.0f} Zeilen/s\n")
+
+        day = (weather_db.to_timestamp(day_start), weather_db.to_timestamp(day_end))
+        queries = (
+            ("neueste 100 Messwerte",
+             lambda: legacy.execute("SELECT * FROM wetterdaten ORDER BY timestamp DESC").fetchall()[:100],
+             lambda: database.get_readings(limit=100)),
+            ("Stadt, ein Tag",
+             lambda: legacy.execute("SELECT * FROM wetterdaten WHERE city = ? AND timestamp >= ? AND timestamp < ? ORDER BY timestamp DESC", (city, *day)).fetchall(),
+             lambda: database.get_readings(city=city, start=day_start, end=day_end, limit=None)),
+            ("Standort, ein Tag",
+             lambda: legacy.execute("SELECT * FROM wetterdaten WHERE latitude = ? AND longitude = ? AND timestamp >= ? AND timestamp < ? ORDER BY timestamp DESC", (latitude, longitude, *day)).fetchall(),
+             lambda: database.get_readings(latitude=latitude, longitude=longitude, start=day_start, end=day_end, limit=None)),
+            ("neuester Wert je Standort",
+             lambda: legacy.execute("SELECT id, city, latitude, longitude, temperature, MAX(timestamp) FROM wetterdaten GROUP BY latitude, longitude").fetchall(),
+             lambda: database.get_latest()),
+            ("Tagesmittel je Standort",
+             lambda: legacy.execute("SELECT city, latitude, longitude, substr(timestamp, 1, 10), COUNT(*), AVG(temperature), MIN(temperature), MAX(temperature) FROM wetterdaten GROUP BY latitude, longitude, substr(timestamp, 1, 10)").fetchall(),
+             lambda: database.get_rollups("day")),
+        )
+        print(f"{'Abfrage':<28}{'ohne Index ms':>15}{'neu ms':>10}{'Zeilen':>9}")
+        for name, old, new in queries:
+            timings = []
+            for query in (old, new):
+                query()
+                begin = time.perf_counter()
+                for _ in range(args.repeat):
+                    result = query()
+                timings.append((time.perf_counter() - begin) / args.repeat * 1000)
+            print(f"{name:<28}{timings[0]:>15.2f}{timings[1]:>10.2f}{len(result):>9}")
+        legacy.close()
+        database.close()
+
+
+def bench_collector(args):
+    """Collector über mehrere Runden: Durchsatz der ersten Runde, danach nur unveränderte Messwerte."""
+    with mock_environment(args.latency, args.nominatim_interval, args.fail_rate) as server:
+        import collector
+
+        locations = make_locations(args.locations)
+        with weather_db.WeatherDatabase() as database:
+            weather_collector = collector.WeatherCollector(locations, database, interval=args.interval, jitter=args.jitter)
+            with contextlib.redirect_stdout(io.StringIO()):
+                asyncio.run(weather_collector.run(rounds=1))
+            first = weather_collector.stats()
+            with contextlib.redirect_stdout(io.StringIO()):
+                asyncio.run(weather_collector.run(rounds=args.rounds))
+            stats = weather_collector.stats()
+        print(f"Runde 1: {first['saved']} Messwerte in {first['round_s']:.2f} s ({first['saved'] / first['round_s']:.0f}/s), "
+              f"Alter der Messwerte p50 {first['observation_lag_p50_s']:.0f} s")
+        print(f"Nach {stats['rounds']} Runden: {stats['saved']} gespeichert, {stats['skipped']} unverändert übersprungen, "
+              f"letzte Runde {stats['round_s']:.2f} s, Verspätung {stats['schedule_lag_s']:.3f} s")
+        print(f"Anfragen: {stats['requests']} ({stats['retries']} Wiederholungen, {stats['errors']} Fehler), "
+              f"Mock: {sum(server.requests.values())} Anfragen, {server.failures} mit 503 beantwortet")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks für die Wetter-Skripte (gegen den lokalen Mock)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    concurrency = subparsers.add_parser("concurrency", help="get_temperature sequentiell vs. Thread-Pool")
+    concurrency.add_argument("--locations", type=int, default=200)
+    concurrency.add_argument("--latency", type=float, default=0.05, help="Antwortzeit des Mocks in Sekunden")
+    concurrency.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8, 16])
+    concurrency.set_defaults(func=bench_concurrency)
+
+    batch = subparsers.add_parser("batch", help="Open-Meteo: eine Anfrage pro Koordinate vs. gebündelt")
+    batch.add_argument("--locations", type=int, default=1000)
+    batch.add_argument("--latency", type=float, default=0.05, help="Antwortzeit des Mocks in Sekunden")
+    batch.set_defaults(func=bench_batch)
+
+    geocode = subparsers.add_parser("geocode", help="Ortsnamen-Cache: Nominatim-Anfragen kalt vs. warm")
+    geocode.add_argument("--locations", type=int, default=100)
+    geocode.add_argument("--runs", type=int, default=3)
+    geocode.add_argument("--latency", type=float, default=0.05, help="Antwortzeit des Mocks in Sekunden")
+    geocode.add_argument("--nominatim-interval", type=float, default=0.05, help="Mindestabstand zwischen Nominatim-Anfragen")
+    geocode.set_defaults(func=bench_geocode)
+
+    session = subparsers.add_parser("session", help="Einzelanfragen: requests.get vs. Session mit Keep-Alive und Retries")
+    session.add_argument("--requests", type=int, default=500)
+    session.add_argument("--workers", type=int, default=8)
+    session.add_argument("--latency", type=float, default=0.0, help="Antwortzeit des Mocks in Sekunden")
+    session.add_argument("--fail-rate", type=float, default=0.0, help="Anteil der Anfragen, die der Mock mit 503 beantwortet")
+    session.set_defaults(func=bench_session)
+
+    db = subparsers.add_parser("db", help="Schreibrate in wetter.db: Verbindung pro Zeile vs. gepuffertes executemany")
+    db.add_argument("--rows", type=int, default=5000)
+    db.add_argument("--locations", type=int, default=100, help="Anzahl verschiedener Standorte (0 = jede Zeile ein eigener)")
+    db.add_argument("--batch-size", type=int, default=weather_db.WRITE_BATCH_SIZE)
+    db.add_argument("--workers", type=int, default=8)
+    db.set_defaults(func=bench_db)
+
+    query = subparsers.add_parser("query", help="Abfragen: Tabelle ohne Indizes vs. Indizes, wetter_aktuell und Rollups")
+    query.add_argument("--rows", type=int, default=200000)
+    query.add_argument("--locations", type=int, default=200)
+    query.add_argument("--days", type=int, default=30)
+    query.add_argument("--repeat", type=int, default=5)
+    query.set_defaults(func=bench_query)
+
+    collector = subparsers.add_parser("collector", help="Async-Collector: Durchsatz, Verzögerung, übersprungene Messwerte")
+    collector.add_argument("--locations", type=int, default=2000)
+    collector.add_argument("--rounds", type=int, default=3, help="Runden insgesamt (die erste füllt die Datenbank)")
+    collector.add_argument("--interval", type=float, default=1.0)
+    collector.add_argument("--jitter", type=float, default=0.2)
+    collector.add_argument("--latency", type=float, default=0.05, help="Antwortzeit des Mocks in Sekunden")
+    collector.add_argument("--nominatim-interval", type=float, default=0.0, help="Mindestabstand zwischen Nominatim-Anfragen")
+    collector.add_argument("--fail-rate", type=float, default=0.0, help="Anteil der Anfragen, die der Mock mit 503 beantwortet")
+    collector.set_defaults(func=bench_collector)
+
+    args = parser.parse_args()
+    args.func(args)
@@ -0,0 +1,303 @@
+"""Sammelt Wetterdaten fortlaufend nach Zeitplan (statt nur per Klick in der App oder über get_temperature).
+
+Der Collector fragt eine feste Liste von Standorten alle `interval` Sekunden bei Open-Meteo ab
+(gebündelt, siehe open_meteo.py) und schreibt neue Messwerte gepuffert in wetter.db (siehe weather_db.py).
+- Jede Anfrage startet mit einer zufälligen Verzögerung (Jitter), damit nicht alle Collector bzw.
+  Bündel im selben Moment anfragen.
+- Pro Host gilt ein Mindestabstand zwischen Anfragen (NOMINATIM_MIN_INTERVAL, OPEN_METEO_MIN_INTERVAL),
+  429/5xx werden mit Backoff wiederholt (Einstellungen aus http_client.py).
+- Open-Meteo aktualisiert `current_weather` nur alle 15 Minuten; Messwerte mit bereits gespeicherter
+  Beobachtungszeit (`current_weather.time`) werden übersprungen. Gespeichert wird die Beobachtungszeit.
+
+Aufruf aus diesem Verzeichnis, z.B. alle 15 Minuten für die Orte aus orte.json
+(Liste von {"latitude": ..., "longitude": ..., optional "city": ...}):
+    python collector.py --locations orte.json --interval 900
+Gegen den lokalen Mock, drei Runden im Abstand von 5 Sekunden:
+    OPEN_METEO_URL=http://127.0.0.1:8765/ NOMINATIM_URL=http://127.0.0.1:8765/ python collector.py --interval 5 --rounds 3
+"""
+import argparse
+import asyncio
+import calendar
+import json
+import os
+import random
+import sqlite3
+import time
+from collections import deque
+from urllib.parse import urlparse
+
+import httpx
+
+import http_client
+import open_meteo
+from requests_01 import (GEOCODE_CACHE, NOMINATIM_MIN_INTERVAL, NOMINATIM_URL, OPEN_METEO_MIN_INTERVAL,
+                         OPEN_METEO_URL, location_name_from_address)
+from weather_db import WeatherDatabase
+
+# Open-Meteo aktualisiert die aktuellen Werte alle 15 Minuten:
+COLLECTOR_INTERVAL = float(os.getenv("COLLECTOR_INTERVAL", "900"))
+# Höchstens so viele Sekunden zufällige Verzögerung vor jeder Anfrage:
+COLLECTOR_JITTER = float(os.getenv("COLLECTOR_JITTER", "10"))
+# Höchstens so viele Anfragen gleichzeitig:
+COLLECTOR_CONCURRENCY = int(os.getenv("COLLECTOR_CONCURRENCY", "8"))
+
+DEFAULT_LOCATIONS = [
+    {"latitude": 52.52, "longitude": 13.41},  # Berlin
+    {"latitude": 48.85, "longitude": 2.35},   # Paris
+    {"latitude": 40.71, "longitude": -74.01}, # New York
+    {"latitude": 35.68, "longitude": 139.69}  # Tokio
+]
+
+
+class AsyncRateLimiter:
+    """Mindestabstand zwischen zwei Anfragen an denselben Host (asyncio-Variante von RateLimiter)."""
+
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._next_slot = 0.0
+
+    async def wait(self):
+        # Ohne await zwischen Lesen und Setzen, die Reservierung ist also atomar:
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.min_interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+def observation_timestamp(value: str) -> str:
+    """Open-Meteo-Zeit ("2025-02-19T12:00", UTC) im Zeitstempel-Format von wetterdaten."""
+    timestamp = value.replace("T", " ")
+    return timestamp if len(timestamp) > 16 else timestamp + ":00"
+
+
+class WeatherCollector:
+    """Fragt die Standorte nach Zeitplan ab und sammelt Kennzahlen zu Durchsatz und Verzögerung."""
+
+    def __init__(self, locations: list, database: WeatherDatabase, interval: float = COLLECTOR_INTERVAL,
+                 jitter: float = COLLECTOR_JITTER, concurrency: int = COLLECTOR_CONCURRENCY):
+        self.locations = locations
+        self.database = database
+        self.interval = interval
+        self.jitter = jitter
+        self.concurrency = concurrency
+        # Wird in run() angelegt, weil asyncio-Objekte an ihre Event-Loop gebunden sind:
+        self._semaphore = None
+        self._limiters = {}
+        for base_url, min_interval in ((OPEN_METEO_URL, OPEN_METEO_MIN_INTERVAL), (NOMINATIM_URL, NOMINATIM_MIN_INTERVAL)):
+            host = urlparse(base_url).netloc
+            limiter = self._limiters.get(host)
+            if limiter is None or limiter.min_interval < min_interval:
+                self._limiters[host] = AsyncRateLimiter(min_interval)
+        # Letzte gespeicherte Beobachtungszeit pro Standort; nach einem Neustart aus wetter_aktuell:
+        self._last_observed = {
+            (latitude, longitude): timestamp
+            for _, _, latitude, longitude, _, timestamp in database.get_latest()
+        }
+        self.started = time.monotonic()
+        self.rounds = 0
+        self.requests = 0
+        self.retries = 0
+        self.errors = 0
+        self.saved = 0
+        self.skipped = 0
+        self.schedule_lag = 0.0
+        self.round_seconds = 0.0
+        # Alter der zuletzt gespeicherten Messwerte (begrenzt, der Collector läuft endlos):
+        self.observation_lags = deque(maxlen=10000)
+
+    async def run(self, rounds: int = 0):
+        """Läuft `rounds` Runden (0 = endlos); verpasste Termine werden übersprungen, nicht nachgeholt.
+
+        Fehler einer Runde werden gezählt und ausgegeben, beenden den Collector aber nicht.
+        """
+        headers = {"User-Agent": "geo-request"}
+        limits = httpx.Limits(max_connections=http_client.POOL_MAXSIZE, max_keepalive_connections=http_client.POOL_MAXSIZE)
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        async with httpx.AsyncClient(timeout=5, headers=headers, limits=limits) as client:
+            scheduled = time.monotonic()
+            while True:
+                self.schedule_lag = time.monotonic() - scheduled
+                try:
+                    await self.poll(client)
+                except Exception as e:
+                    # Ein Fehler (z.B. "database is locked") kostet nur diese Runde, der Zeitplan läuft weiter:
+                    self.errors += 1
+                    self.rounds += 1
+                    print(f"Fehler in Runde {self.rounds}: {type(e).__name__}: {e}")
+                print(self.format_stats())
+                if rounds and self.rounds >= rounds:
+                    break
+                now = time.monotonic()
+                scheduled += max(1, -(-(now - scheduled) // self.interval)) * self.interval
+                await asyncio.sleep(scheduled - now)
+
+    async def poll(self, client: httpx.AsyncClient):
+        """Eine Runde: alle Bündel parallel abfragen, neue Messwerte je Bündel in die Datenbank geben."""
+        start = time.monotonic()
+        coordinates = [(location["latitude"], location["longitude"]) for location in self.locations]
+        batches = open_meteo.batch_urls(OPEN_METEO_URL + "v1/forecast", coordinates)
+        offsets = [0]
+        for _, count in batches:
+            offsets.append(offsets[-1] + count)
+        await asyncio.gather(*(
+            self.poll_batch(client, url, self.locations[offset:offset + count])
+            for (url, count), offset in zip(batches, offsets)
+        ))
+        # Den Rest des Puffers schreiben, ohne die Event-Loop zu blockieren:
+        await asyncio.to_thread(self.database.flush)
+        self.rounds += 1
+        self.round_seconds = time.monotonic() - start
+
+    async def poll_batch(self, client: httpx.AsyncClient, url: str, locations: list):
+        try:
+            data = await self.get_json(client, url, jitter=True)
+        except (httpx.HTTPError, json.JSONDecodeError) as e:
+            self.errors += 1
+            print(f"Fehler bei gebündelter Anfrage ({len(locations)} Standorte): {e}")
+            return
+        results = data if isinstance(data, list) else [data]
+        if len(results) != len(locations):
+            self.errors += 1
+            print(f"Fehler: {len(results)} statt {len(locations)} Ergebnisse von Open-Meteo erhalten")
+            return
+
+        changed = []
+        for location, result in zip(locations, results):
+            current_weather = result.get("current_weather") if isinstance(result, dict) else None
+            if current_weather is None:
+                continue
+            key = (location["latitude"], location["longitude"])
+            timestamp = observation_timestamp(current_weather["time"])
+            if self._last_observed.get(key) == timestamp:
+                self.skipped += 1
+                continue
+            changed.append((location, key, current_weather["temperature"], timestamp))
+
+        # Ortsnamen nur für neue Messwerte und parallel auflösen (Rate-Limit und Semaphore gelten weiter):
+        names = [location.get("city") for location, _, _, _ in changed]
+        missing = [index for index, name in enumerate(names) if not name]
+        resolved = await asyncio.gather(*(self.location_name(client, *changed[index][1]) for index in missing))
+        for index, name in zip(missing, resolved):
+            names[index] = name
+        now = time.time()
+        readings = []
+        for name, (_, key, temperature, timestamp) in zip(names, changed):
+            readings.append((name, *key, temperature, timestamp))
+            # Wie alt der Messwert beim Speichern ist (Open-Meteo: bis zu 15 Minuten plus Laufzeit):
+            self.observation_lags.append(now - calendar.timegm(time.strptime(timestamp, "%Y-%m-%d %H:%M:%S")))
+        if readings:
+            # save_many schreibt ggf. sofort ein ganzes Bündel, deshalb in einem Thread:
+            try:
+                await asyncio.to_thread(self.database.save_many, readings)
+            except sqlite3.Error:
+                # Die Zeilen sind schon im Puffer, WeatherDatabase behält sie bis zum nächsten erfolgreichen flush:
+                self._mark_observed(changed)
+                raise
+            self._mark_observed(changed)
+            self.saved += len(readings)
+
+    def _mark_observed(self, changed: list):
+        """Merkt sich die Beobachtungszeiten erst, wenn die Messwerte in der Datenbank (bzw. deren Puffer) sind.
+
+        Scheitert eine Runde vorher, werden die Messwerte in der nächsten Runde erneut gespeichert.
+        """
+        for _, key, _, timestamp in changed:
+            self._last_observed[key] = timestamp
+
+    async def location_name(self, client: httpx.AsyncClient, latitude: float, longitude: float) -> str | None:
+        """Ortsname aus dem gemeinsamen Cache (geocode_cache.db), sonst von Nominatim; None, wenn unbekannt.
+
+        Fehlschläge landen nicht im Cache, der Messwert wird dann ohne Ortsnamen (city NULL) gespeichert.
+        """
+        name = GEOCODE_CACHE.get(latitude, longitude)
+        if name is not None:
+            return name
+        try:
+            data = await self.get_json(client, f"{NOMINATIM_URL}reverse", params={"lat": latitude, "lon": longitude, "format": "json"})
+        except (httpx.HTTPError, json.JSONDecodeError) as e:
+            self.errors += 1
+            print(f"Netzwerkfehler bei OpenStreetMap für Koordinaten ({latitude}, {longitude}): {e}")
+            return None
+        address = data.get("address") if isinstance(data, dict) else None
+        name = location_name_from_address(address) if isinstance(address, dict) else None
+        if name is not None:
+            GEOCODE_CACHE.put(latitude, longitude, name)
+        return name
+
+    async def get_json(self, client: httpx.AsyncClient, url: str, jitter: bool = False, **kwargs):
+        """GET mit Rate-Limit pro Host und Retries bei 429/5xx (Backoff mit Jitter, Retry-After wird beachtet)."""
+        if jitter and self.jitter > 0:
+            await asyncio.sleep(random.uniform(0, self.jitter))
+        limiter = self._limiters.get(urlparse(url).netloc)
+        for attempt in range(http_client.MAX_RETRIES + 1):
+            async with self._semaphore:
+                if limiter is not None:
+                    await limiter.wait()
+                self.requests += 1
+                response = await client.get(url, **kwargs)
+            if response.status_code not in http_client.RETRY_STATUS_CODES or attempt == http_client.MAX_RETRIES:
+                break
+            self.retries += 1
+            retry_after = response.headers.get("Retry-After", "")
+            delay = float(retry_after) if retry_after.isdigit() else http_client.BACKOFF_FACTOR * 2 ** attempt
+            await asyncio.sleep(delay + random.uniform(0, http_client.BACKOFF_JITTER))
+        response.raise_for_status()
+        return response.json()
+
+    def stats(self) -> dict:
+        elapsed = time.monotonic() - self.started
+        lags = sorted(self.observation_lags)
+        return {
+            "rounds": self.rounds,
+            "requests": self.requests,
+            "retries": self.retries,
+            "errors": self.errors,
+            "saved": self.saved,
+            "skipped": self.skipped,
+            "saved_per_s": self.saved / elapsed if elapsed else 0.0,
+            "round_s": self.round_seconds,
+            "schedule_lag_s": self.schedule_lag,
+            "observation_lag_p50_s": lags[len(lags) // 2] if lags else 0.0,
+            "observation_lag_max_s": lags[-1] if lags else 0.0,
+        }
+
+    def format_stats(self) -> str:
+        stats = self.stats()
+        return (
+            f"Runde {stats['rounds']}: {stats['saved']} gespeichert, {stats['skipped']} unverändert, "
+            f"{stats['requests']} Anfragen ({stats['retries']} Wiederholungen, {stats['errors']} Fehler), "
+            f"Runde {stats['round_s']:.2f} s, Verspätung {stats['schedule_lag_s']:.2f} s, "
+            f"Alter der Messwerte p50 {stats['observation_lag_p50_s']:.0f} s"
+        )
+
+
+def load_locations(path: str | None) -> list:
+    if path is None:
+        return DEFAULT_LOCATIONS
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+async def main(args):
+    with WeatherDatabase() as database:
+        collector = WeatherCollector(load_locations(args.locations), database, args.interval, args.jitter, args.concurrency)
+        try:
+            await collector.run(args.rounds)
+        finally:
+            print("Collector:", collector.stats())
+            print("Ortsnamen-Cache:", GEOCODE_CACHE.stats())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sammelt Wetterdaten fortlaufend nach Zeitplan")
+    parser.add_argument("--locations", help="JSON-Datei mit Standorten (Standard: Berlin, Paris, New York, Tokio)")
+    parser.add_argument("--interval", type=float, default=COLLECTOR_INTERVAL, help="Sekunden zwischen zwei Runden")
+    parser.add_argument("--jitter", type=float, default=COLLECTOR_JITTER, help="Höchstens so viele Sekunden Verzögerung vor jeder Anfrage")
+    parser.add_argument("--concurrency", type=int, default=COLLECTOR_CONCURRENCY)
+    parser.add_argument("--rounds", type=int, default=0, help="Anzahl Runden (0 = endlos)")
+    args = parser.parse_args()
+    try:
+        asyncio.run(main(args))
+    except KeyboardInterrupt:
+        pass
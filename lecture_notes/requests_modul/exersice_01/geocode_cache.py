@@ -0,0 +1,118 @@
+"""Cache für Ortsnamen (Reverse-Geocoding über Nominatim).
+
+Nominatim erlaubt nur etwa eine Anfrage pro Sekunde, die Ortsnamen ändern sich aber praktisch nie.
+Deshalb wird jedes Ergebnis in einer SQLite-Datei neben wetter.db gespeichert, davor liegt ein
+LRU-Cache im Speicher. Schlüssel sind auf `precision` Nachkommastellen gerundete Koordinaten
+(2 Stellen ≈ 1 km), nahe beieinander liegende Punkte teilen sich also einen Eintrag.
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+GEOCODE_DB = os.getenv("GEOCODE_DB", "geocode_cache.db")
+GEOCODE_PRECISION = int(os.getenv("GEOCODE_PRECISION", "2"))
+# Einträge gelten so viele Sekunden (Standard: 30 Tage):
+GEOCODE_TTL = float(os.getenv("GEOCODE_TTL", str(30 * 24 * 3600)))
+GEOCODE_CACHE_SIZE = int(os.getenv("GEOCODE_CACHE_SIZE", "10000"))
+
+
+class GeocodeCache:
+    """LRU im Speicher + SQLite-Datei, mit TTL und Treffer-Statistik (threadsicher)."""
+
+    def __init__(self, path: str = GEOCODE_DB, precision: int = GEOCODE_PRECISION,
+                 ttl: float = GEOCODE_TTL, maxsize: int = GEOCODE_CACHE_SIZE):
+        self.path = path
+        self.precision = precision
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        # Die Datei wird erst beim ersten Zugriff angelegt, nicht schon beim Import:
+        self._conn = None
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    def key(self, latitude: float, longitude: float) -> str:
+        return f"{round(latitude, self.precision):.{self.precision}f},{round(longitude, self.precision):.{self.precision}f}"
+
+    def get(self, latitude: float, longitude: float) -> str | None:
+        key = self.key(latitude, longitude)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and entry[1] > now:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return entry[0]
+
+            row = self._connection().execute("SELECT name, expires_at FROM ortsnamen WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            if row[1] <= now:
+                self.expired += 1
+                self.misses += 1
+                return None
+            self.db_hits += 1
+            self._remember(key, row[0], row[1])
+            return row[0]
+
+    def put(self, latitude: float, longitude: float, name: str):
+        key = self.key(latitude, longitude)
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            conn = self._connection()
+            conn.execute("INSERT OR REPLACE INTO ortsnamen (key, name, expires_at) VALUES (?, ?, ?)", (key, name, expires_at))
+            conn.commit()
+            self._remember(key, name, expires_at)
+
+    def get_or_fetch(self, latitude: float, longitude: float, fetch) -> str | None:
+        """Name aus dem Cache oder über `fetch(latitude, longitude)`; nur gefundene Namen werden gespeichert."""
+        name = self.get(latitude, longitude)
+        if name is None:
+            name = fetch(latitude, longitude)
+            if name is not None:
+                self.put(latitude, longitude, name)
+        return name
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            conn = self._connection()
+            deleted = conn.execute("DELETE FROM ortsnamen WHERE expires_at <= ?", (time.time(),)).rowcount
+            conn.commit()
+            return deleted
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.db_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "hit_rate": (self.memory_hits + self.db_hits) / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+    def _remember(self, key: str, name: str, expires_at: float):
+        self._memory[key] = (name, expires_at)
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS ortsnamen (
+                    key TEXT PRIMARY KEY,
+                    name TEXT,
+                    expires_at REAL
+                )
+            """)
+            self._conn.commit()
+        return self._conn
@@ -0,0 +1,48 @@
+"""Gemeinsame HTTP-Session für die Wetter-Skripte.
+
+`requests.get` baut für jeden Aufruf eine neue Verbindung auf (TCP- und TLS-Handshake).
+Eine `requests.Session` hält die Verbindungen pro Host in einem Pool offen (Keep-Alive) und
+wiederholt fehlgeschlagene Anfragen (429 und 5xx) mit exponentiellem Backoff und Jitter.
+"""
+import os
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Anzahl der Hosts mit eigenem Pool (Open-Meteo, Nominatim, ...):
+POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "4"))
+# Offene Verbindungen pro Host; sollte mindestens der Anzahl paralleler Threads entsprechen:
+POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "16"))
+MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+# Wartezeit vor dem n-ten Versuch: BACKOFF_FACTOR * 2**(n-1) Sekunden plus zufällig bis BACKOFF_JITTER:
+BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", "0.5"))
+BACKOFF_JITTER = float(os.getenv("HTTP_BACKOFF_JITTER", "0.25"))
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+def create_session(pool_connections: int = POOL_CONNECTIONS, pool_maxsize: int = POOL_MAXSIZE,
+                   max_retries: int = MAX_RETRIES, backoff_factor: float = BACKOFF_FACTOR,
+                   backoff_jitter: float = BACKOFF_JITTER) -> requests.Session:
+    """Erstellt eine Session mit Verbindungspool, Retries und gzip."""
+    retry = Retry(
+        total=max_retries,
+        backoff_factor=backoff_factor,
+        backoff_jitter=backoff_jitter,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=("GET",),
+        # Bei 429/503 die Wartezeit aus dem Retry-After-Header des Servers übernehmen:
+        respect_retry_after_header=True,
+        # Nach dem letzten Versuch die Antwort zurückgeben, raise_for_status() meldet dann den Fehler:
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Accept-Encoding": "gzip, deflate", "User-Agent": "geo-request"})
+    return session
+
+
+# Eine Session für das ganze Skript (requests.Session ist für parallele GET-Anfragen aus Threads geeignet):
+SESSION = create_session()
@@ -0,0 +1,120 @@
+"""Lokaler Ersatz für Open-Meteo und Nominatim (für Tests und Benchmarks ohne Internet).
+
+Start, z.B. mit 50 ms künstlicher Latenz:
+    python mock_server.py --port 8765 --latency 0.05
+Danach die Skripte gegen den Mock laufen lassen:
+    OPEN_METEO_URL=http://127.0.0.1:8765/ NOMINATIM_URL=http://127.0.0.1:8765/ python requests_01.py
+Mit `--fail-rate 0.2` antwortet der Mock zufällig auf 20 % der Anfragen mit 503 (zum Testen der Retries).
+"""
+import argparse
+import gzip
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1, damit Clients die Verbindung offen halten können (Keep-Alive):
+    protocol_version = "HTTP/1.1"
+    # Header und Body werden getrennt geschrieben; ohne TCP_NODELAY wartet die zweite Hälfte auf das
+    # verzögerte ACK des Clients (~40 ms pro Anfrage auf offenen Verbindungen):
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        time.sleep(self.server.latency)
+        self.server.count_request(url.path)
+
+        if self.server.should_fail():
+            self.send_response(503)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        if url.path == "/v1/forecast":
+            # Wie Open-Meteo: "current" wird alle 15 Minuten aktualisiert, Zeit in UTC (GMT).
+            observed = time.strftime("%Y-%m-%dT%H:%M", time.gmtime(time.time() // 900 * 900))
+            # Wie Open-Meteo: kommagetrennte Koordinaten ergeben eine Liste, eine einzelne ein Objekt.
+            latitudes = [float(value) for value in query["latitude"].split(",")]
+            longitudes = [float(value) for value in query["longitude"].split(",")]
+            body = [
+                {
+                    "latitude": latitude,
+                    "longitude": longitude,
+                    "current_weather": {"temperature": round(latitude / 4, 1), "time": observed},
+                }
+                for latitude, longitude in zip(latitudes, longitudes)
+            ]
+            body = body[0] if len(body) == 1 else body
+        elif url.path == "/reverse":
+            body = {"address": {"city": f"Ort {float(query['lat']):.2f},{float(query['lon']):.2f}"}}
+        else:
+            self.send_error(404)
+            return
+
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            data = gzip.compress(data)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency: float = 0.0, fail_rate: float = 0.0):
+        super().__init__(address, MockHandler)
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.requests = {}
+        # Neue TCP-Verbindungen (ohne Keep-Alive eine pro Anfrage):
+        self.connections = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def count_request(self, path: str):
+        with self._lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+
+    def should_fail(self) -> bool:
+        if self.fail_rate <= 0 or random.random() >= self.fail_rate:
+            return False
+        with self._lock:
+            self.failures += 1
+        return True
+
+    def process_request_thread(self, request, client_address):
+        with self._lock:
+            self.connections += 1
+        super().process_request_thread(request, client_address)
+
+
+def start_mock_server(port: int = 0, latency: float = 0.0, fail_rate: float = 0.0) -> tuple[MockServer, str]:
+    """Startet den Mock in einem Hintergrund-Thread und gibt Server und Basis-URL zurück."""
+    server = MockServer(("127.0.0.1", port), latency, fail_rate)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock für Open-Meteo und Nominatim")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05, help="Künstliche Antwortzeit in Sekunden")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Anteil der Anfragen, die mit 503 beantwortet werden")
+    args = parser.parse_args()
+
+    server = MockServer(("127.0.0.1", args.port), args.latency, args.fail_rate)
+    print(f"Mock läuft auf http://127.0.0.1:{args.port}/")
+    server.serve_forever()
@@ -0,0 +1,77 @@
+"""Gebündelte Abfragen an Open-Meteo: viele Koordinaten in einer Anfrage.
+
+Open-Meteo akzeptiert kommagetrennte Listen, z.B. `?latitude=52.52,48.85&longitude=13.41,2.35`,
+und antwortet dann mit einer JSON-Liste (ein Objekt pro Koordinate, in derselben Reihenfolge).
+"""
+import json
+import requests
+
+# Viele Server und Proxys lehnen URLs über ~2000 Zeichen ab; darunter bleiben:
+MAX_URL_LENGTH = 2000
+# Höchstens so viele Koordinaten pro Anfrage:
+MAX_LOCATIONS_PER_REQUEST = 100
+
+
+def batch_urls(base_url: str, coordinates: list, params: str = "current_weather=true") -> list[tuple[str, int]]:
+    """Teilt die Koordinaten in Anfragen unterhalb von MAX_URL_LENGTH auf.
+
+    Gibt eine Liste von (url, anzahl_koordinaten) in der Reihenfolge der Eingabe zurück.
+    """
+    batches = []
+    latitudes, longitudes = [], []
+
+    def build_url(lats, lons):
+        return f"{base_url}?latitude={','.join(lats)}&longitude={','.join(lons)}&{params}"
+
+    for latitude, longitude in coordinates:
+        lat, lon = str(latitude), str(longitude)
+        too_long = len(build_url(latitudes + [lat], longitudes + [lon])) > MAX_URL_LENGTH
+        if latitudes and (too_long or len(latitudes) >= MAX_LOCATIONS_PER_REQUEST):
+            batches.append((build_url(latitudes, longitudes), len(latitudes)))
+            latitudes, longitudes = [], []
+        latitudes.append(lat)
+        longitudes.append(lon)
+    if latitudes:
+        batches.append((build_url(latitudes, longitudes), len(latitudes)))
+    return batches
+
+
+def fetch_batch(get, url: str, count: int, timeout: float = 5) -> list:
+    """Führt eine gebündelte Anfrage aus und gibt pro Koordinate das Antwortobjekt zurück.
+
+    `get` ist die Funktion für den HTTP-Aufruf (z.B. `requests.get` oder eine Session).
+    Bei einem Fehler ist jeder Eintrag des Bündels None.
+    """
+    try:
+        response = get(url, timeout=timeout)
+        response.raise_for_status()
+        data = response.json()
+        # Bei nur einer Koordinate antwortet Open-Meteo mit einem Objekt statt einer Liste:
+        results = data if isinstance(data, list) else [data]
+        if len(results) != count:
+            print(f"Fehler: {len(results)} statt {count} Ergebnisse von Open-Meteo erhalten")
+            return [None] * count
+        return results
+    except requests.exceptions.Timeout:
+        print(f"Fehler: Zeitüberschreitung bei gebündelter Anfrage ({count} Standorte)")
+    except requests.exceptions.RequestException as e:
+        print(f"Netzwerkfehler bei gebündelter Anfrage ({count} Standorte): {e}")
+    except json.JSONDecodeError:
+        print(f"Fehler: Ungültige JSON-Antwort bei gebündelter Anfrage ({count} Standorte)")
+    return [None] * count
+
+
+def fetch_current_weather(get, base_url: str, coordinates: list, map_func=map, timeout: float = 5) -> list:
+    """Holt `current_weather` für alle Koordinaten mit möglichst wenigen Anfragen.
+
+    Die Bündel werden über `map_func` ausgeführt (z.B. `executor.map` für parallele Anfragen).
+    Ergebnis: eine Liste in der Reihenfolge von `coordinates`, Einträge sind das
+    `current_weather`-dict oder None.
+    """
+    batches = batch_urls(base_url, coordinates)
+    responses = map_func(lambda batch: fetch_batch(get, *batch, timeout=timeout), batches)
+    return [
+        result.get("current_weather") if isinstance(result, dict) else None
+        for results in responses
+        for result in results
+    ]
@@ -1,79 +1,147 @@
 import requests
 import json
+import os
 import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import open_meteo
+from geocode_cache import GeocodeCache
+from http_client import SESSION
+from weather_db import WeatherDatabase
+
+# Basis-URLs per Umgebungsvariable überschreibbar, z.B. für den lokalen Mock (mock_server.py):
+OPEN_METEO_URL = os.getenv("OPEN_METEO_URL", "https://api.open-meteo.com/")
+NOMINATIM_URL = os.getenv("NOMINATIM_URL", "https://nominatim.openstreetmap.org/")
+
+# Höchstens so viele Standorte werden gleichzeitig abgefragt:
+MAX_WORKERS = int(os.getenv("WEATHER_MAX_WORKERS", "8"))
+# Mindestabstand in Sekunden zwischen zwei Anfragen an Nominatim (Nutzungsrichtlinie: max. 1/s):
+NOMINATIM_MIN_INTERVAL = float(os.getenv("NOMINATIM_MIN_INTERVAL", "1.0"))
+OPEN_METEO_MIN_INTERVAL = float(os.getenv("OPEN_METEO_MIN_INTERVAL", "0"))
+
+class RateLimiter:
+    """Sorgt threadsicher für einen Mindestabstand zwischen zwei Anfragen an denselben Host."""
+
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self):
+        # Nur die Reservierung des nächsten Zeitfensters passiert unter der Sperre, gewartet wird danach:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.min_interval
+        if slot > now:
+            time.sleep(slot - now)
+
+def build_rate_limiters() -> dict:
+    """Ein RateLimiter pro Host (Host:Port aus der Basis-URL); teilen sich zwei APIs einen Host, gilt das strengere Limit."""
+    min_intervals = {}
+    for base_url, min_interval in ((OPEN_METEO_URL, OPEN_METEO_MIN_INTERVAL), (NOMINATIM_URL, NOMINATIM_MIN_INTERVAL)):
+        host = urlparse(base_url).netloc
+        min_intervals[host] = max(min_intervals.get(host, 0.0), min_interval)
+    return {host: RateLimiter(min_interval) for host, min_interval in min_intervals.items() if min_interval > 0}
+
+RATE_LIMITERS = build_rate_limiters()
+
+# Ortsnamen werden in geocode_cache.db (neben wetter.db) zwischengespeichert:
+GEOCODE_CACHE = GeocodeCache()
+
+# Eine Verbindung zu wetter.db für das ganze Skript; Messwerte werden gepuffert und gebündelt geschrieben:
+DATABASE = WeatherDatabase()
+
+def rate_limited_get(url: str, **kwargs):
+    """GET über die gemeinsame Session (Keep-Alive, Retries), wartet vorher ggf. auf den RateLimiter des Hosts."""
+    limiter = RATE_LIMITERS.get(urlparse(url).netloc)
+    if limiter is not None:
+        limiter.wait()
+    return SESSION.get(url, **kwargs)
+
+def get_temperature(locations: list, max_workers: int = MAX_WORKERS):
+    """Holt die aktuelle Temperatur für eine Liste von Standorten mit Open-Meteo und speichert die Ergebnisse.
+
+    Die Temperaturen werden gebündelt abgefragt (viele Koordinaten pro Anfrage, siehe open_meteo.py),
+    die Bündel und die Ortsnamen parallel in einem Thread-Pool (höchstens `max_workers` gleichzeitig).
+    Die Ergebnisse stehen trotzdem in der Reihenfolge der Eingabe.
+    """
+
+    coordinates = [(location["latitude"], location["longitude"]) for location in locations]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        current_weather = open_meteo.fetch_current_weather(
+            rate_limited_get, OPEN_METEO_URL + "v1/forecast", coordinates, map_func=executor.map
+        )
+        # executor.map liefert die Ergebnisse in der Reihenfolge von locations:
+        results = list(executor.map(save_temperature, locations, current_weather))
+
+    # Was noch im Puffer liegt, in einer Transaktion schreiben:
+    try:
+        DATABASE.flush()
+    except sqlite3.DatabaseError as db_error:
+        print(f"Fehler beim Speichern der Wetterdaten: {db_error}")
+
+    return [result for result in results if result is not None]
+
+def save_temperature(location: dict, current_weather: dict | None):
+    """Ermittelt den Ortsnamen und speichert die Temperatur eines Standorts (None bei Fehlern)."""
+
+    latitude = location["latitude"]
+    longitude = location["longitude"]
+    location_name = f"{latitude}, {longitude}"
+
+    try:
+        location_name = get_location_name(latitude, longitude)
+
+        if current_weather is not None:
+            temperature = current_weather["temperature"]
+            save_weather_data_to_db(location_name, latitude, longitude, temperature)
+
+            print(f"Temperatur in {location_name}: {temperature}°C")
+            return {
+                "city": location_name,
+                "latitude": latitude,
+                "longitude": longitude,
+                "temperature": temperature
+            }
+
+        else:
+            print(f"Keine Wetterdaten für {location_name} erhalten.")
+    except requests.exceptions.Timeout:
+        print(f"Fehler: Zeitüberschreitung für {location_name}")
+    except requests.exceptions.RequestException as e:
+        print(f"Netzwerkfehler bei {location_name}: {e}")
+    except json.JSONDecodeError:
+        print(f"Fehler: Ungültige JSON-Antwort für {location_name}")
+    except Exception as e:
+        print(f"Unerwarteter Fehler bei {location_name}: {e}")
 
-def get_temperature(locations: list):
-    """Holt die aktuelle Temperatur für eine Liste von Standorten mit Open-Meteo und speichert die Ergebnisse."""
-
-    BASE_URL = "https://api.open-meteo.com/"
-    temperature_storage = []
-
-    for location in locations:
-        latitude = location["latitude"]
-        longitude = location["longitude"]
-        
-        try:
-            location_name = get_location_name(latitude, longitude)
-            ENDPOINT_1 = f"v1/forecast?latitude={latitude}&longitude={longitude}&current_weather=true"
-            response = requests.get(BASE_URL + ENDPOINT_1, timeout=5)
-            # Falls HTTP-Fehler (400-499, 500-599), Exception auslösen:
-            response.raise_for_status()
-            data = response.json()
-
-
-
-            if "current_weather" in data:
-                current_weather = data["current_weather"]
-                temperature = current_weather["temperature"]
-                save_weather_data_to_db(location_name, latitude, longitude, temperature)
-
-                temperature_storage.append({
-                    "city": location_name,
-                    "latitude": latitude,
-                    "longitude": longitude,
-                    "temperature": temperature
-                })
-                print(f"Temperatur in {location_name}: {temperature}°C")
-
-            else:
-                print(f"Keine Wetterdaten für {location_name} erhalten.")
-        except requests.exceptions.Timeout:
-            print(f"Fehler: Zeitüberschreitung für {location_name}")
-        except requests.exceptions.RequestException as e:
-            print(f"Netzwerkfehler bei {location_name}: {e}")
-        except json.JSONDecodeError:
-            print(f"Fehler: Ungültige JSON-Antwort für {location_name}")
-        except Exception as e:
-            print(f"Unerwarteter Fehler bei {location_name}: {e}")
-
-    return temperature_storage
+    return None
     
 def get_location_name(latitude: float, longitude: float) -> str:
-    """Ermittelt nur den Stadtnamen aus den Koordinaten mit der OpenStreetMap Nominatim API."""
+    """Ermittelt den Stadtnamen aus den Koordinaten, zuerst aus dem Cache (siehe geocode_cache.py)."""
+
+    # Nur gefundene Namen landen im Cache, der Platzhalter wird erst hier eingesetzt:
+    return GEOCODE_CACHE.get_or_fetch(latitude, longitude, fetch_location_name) or "Ort nicht gefunden"
+
+def fetch_location_name(latitude: float, longitude: float) -> str | None:
+    """Ermittelt nur den Stadtnamen aus den Koordinaten mit der OpenStreetMap Nominatim API (None, wenn keiner gefunden)."""
     
-    BASE_URL = "https://nominatim.openstreetmap.org/"
     ENDPOINT_1 = f"reverse?lat={latitude}&lon={longitude}&format=json"
-    url = f"{BASE_URL}{ENDPOINT_1}"  
+    url = f"{NOMINATIM_URL}{ENDPOINT_1}"  
     # Laut Dokumentation muss ein User-Agent angegeben werden:
     headers = {"User-Agent": "geo-request"}  
 
     try:
-        response = requests.get(url, headers=headers, timeout=5)
+        response = rate_limited_get(url, headers=headers, timeout=5)
         response.raise_for_status()
         data = response.json()
 
         if "address" in data:
-            address = data["address"]
-            
-            if "city" in address:
-                return address["city"]
-            elif "town" in address:
-                return address["town"]
-            elif "village" in address:
-                return address["village"]
-            elif "hamlet" in address:
-                return address["hamlet"]
-            return "Ort nicht gefunden"
+            return location_name_from_address(data["address"])
 
     except requests.exceptions.Timeout:
         print(f"Fehler: Zeitüberschreitung beim Abrufen der Ortsdaten ({latitude}, {longitude})")
@@ -84,55 +152,33 @@ def get_location_name(latitude: float, longitude: float) -> str:
     except Exception as e:
         print(f"Unerwarteter Fehler: {e}")
 
-        return "Ort nicht gefunden"
+    return None
+
+def location_name_from_address(address: dict) -> str | None:
+    """Wählt aus einer Nominatim-Adresse den passenden Ortsnamen (Stadt, sonst Kleinstadt, Dorf, Weiler), sonst None."""
+    
+    for key in ("city", "town", "village", "hamlet"):
+        if key in address:
+            return address[key]
+    return None
 
 def create_database():
     """Erstellt die SQLite-Datenbank und die Tabelle wetterdaten, falls sie noch nicht existiert."""
 
     try:
-        # Verbindung zur Datenbank herstellen (erstellt Datei, falls nicht vorhanden):
-        conn = sqlite3.connect("wetter.db")
-        # Cursor erstellen (ein spezielles Objekt, das SQL-Befehle ausführt):
-        cursor = conn.cursor()
-        # Tabelle erstellen (falls nicht vorhanden), führt ein SQL-Statement aus:
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS wetterdaten (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                city TEXT,
-                latitude REAL,
-                longitude REAL,
-                temperature REAL,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-
-        # Änderungen in der Datenbank speichern:
-        conn.commit()
+        # Öffnet die Verbindung (erstellt Datei und Tabelle, falls nicht vorhanden, siehe weather_db.py):
+        DATABASE.create_database()
         print("Datenbank und Tabelle wurden erfolgreich erstellt!")
     except sqlite3.DatabaseError as db_error:
         print(f"Fehler beim Erstellen der Datenbank: {db_error}")
-    except sqlite3.OperationalError as op_error:
-        print(f"Betriebsfehler (OperationalError): {op_error}")
     except Exception as e:
         print(f"Unerwarteter Fehler beim Erstellen der Datenbank: {e}")
-    finally:
-        if conn:
-            conn.close()
 
 def save_weather_data_to_db(city, latitude, longitude, temperature):
-    """Speichert Wetterdaten in der SQLite-Datenbank wetter.db.""" 
+    """Speichert Wetterdaten in der SQLite-Datenbank wetter.db (gepuffert, siehe weather_db.py).""" 
 
     try:
-        conn = sqlite3.connect("wetter.db")
-        cursor = conn.cursor()
-
-        # SQL-Befehl zum Einfügen von Daten:
-        cursor.execute("""
-            INSERT INTO wetterdaten (city, latitude, longitude, temperature) 
-            VALUES (?, ?, ?, ?)
-        """, (city, latitude, longitude, temperature))
-
-        conn.commit() 
+        DATABASE.save_weather_data(city, latitude, longitude, temperature)
 
     except sqlite3.IntegrityError as int_error:
         # Fehler falls Einschränkungen verletzt werden:
@@ -143,19 +189,11 @@ def save_weather_data_to_db(city, latitude, longitude, temperature):
         print(f"Fehler in der Datenbank für {city}: {db_error}")
     except Exception as e:
         print(f"Unerwarteter Fehler beim Speichern von {city}: {e}")
-    finally:
-        if conn:
-            conn.close()
 
 def get_saved_weather():
     """Ruft alle gespeicherten Wetterdaten aus der Datenbank ab."""
     try:
-        conn = sqlite3.connect("wetter.db")
-        cursor = conn.cursor()
-
-        # Ausführen des SQL-Befehls:
-        cursor.execute("SELECT * FROM wetterdaten ORDER BY timestamp DESC")
-        data = cursor.fetchall()
+        data = DATABASE.get_saved_weather()
 
         # Falls keine Daten vorhanden sind, leere Liste returnen:
         if not data:
@@ -171,10 +209,6 @@ def get_saved_weather():
     except sqlite3.DatabaseError as e:
         print(f"Datenbankfehler: {e}")
         return []
-    
-    finally:
-        if conn:
-            conn.close()
 
 def get_weather_by_city(city_name: str):
     """Holt Wetterdaten aus der SQLite-Datenbank für eine bestimmte Stadt."""
@@ -183,18 +217,9 @@ def get_weather_by_city(city_name: str):
         if not city_name.strip():
             print("Fehler: Der Stadtname darf nicht leer sein.")
             return []
-        
-        conn = sqlite3.connect("wetter.db")
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            SELECT * FROM wetterdaten 
-            WHERE city = ? 
-            ORDER BY timestamp DESC
-        """, (city_name,))
 
         # Alle gefundenen Einträge abrufen:
-        data = cursor.fetchall()  
+        data = DATABASE.get_weather_by_city(city_name)
 
         if not data:
             print(f"Keine gespeicherten Wetterdaten für {city_name} gefunden.")
@@ -209,10 +234,6 @@ def get_weather_by_city(city_name: str):
     except sqlite3.DatabaseError as e:
         print(f"Datenbankfehler: {e}")
         return []
-    
-    finally:
-        if conn:
-            conn.close()
 
 if __name__ == "__main__":
 
@@ -228,4 +249,6 @@ if __name__ == "__main__":
     data_from_db = get_saved_weather()
     print(json.dumps(data_from_db, indent=4, ensure_ascii=False))
     berlin_data = get_weather_by_city("Berlin")
-    print("berlin_data:", json.dumps(berlin_data, indent=4, ensure_ascii=False))
\ No newline at end of file
+    print("berlin_data:", json.dumps(berlin_data, indent=4, ensure_ascii=False))
+    print("Ortsnamen-Cache:", GEOCODE_CACHE.stats())
+    DATABASE.close()
\ No newline at end of file
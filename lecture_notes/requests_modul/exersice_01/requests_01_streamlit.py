@@ -4,6 +4,11 @@ import sqlite3
 import streamlit as st
 import pandas as pd
 
+# Gemeinsame Session: Verbindungen bleiben offen, 429/5xx werden mit Backoff wiederholt
+from http_client import SESSION
+import weather_db
+from weather_db import WeatherDatabase
+
 def get_temperature(latitude: float, longitude: float):
     """Holt die aktuelle Temperatur für eine Stadt mit Open-Meteo."""
 
@@ -11,7 +16,7 @@ def get_temperature(latitude: float, longitude: float):
     ENDPOINT_1 = f"v1/forecast?latitude={latitude}&longitude={longitude}&current_weather=true"
         
     try:
-        response = requests.get(BASE_URL + ENDPOINT_1, timeout=5)
+        response = SESSION.get(BASE_URL + ENDPOINT_1, timeout=5)
         # Falls HTTP-Fehler (400-499, 500-599), Exception auslösen:
         response.raise_for_status()
         data = response.json()
@@ -47,7 +52,7 @@ def get_location_name(latitude: float, longitude: float) -> str:
     headers = {"User-Agent": "geo-request"}  
 
     try:
-        response = requests.get(url, headers=headers, timeout=5)
+        response = SESSION.get(url, headers=headers, timeout=5)
         response.raise_for_status()
         data = response.json()
 
@@ -75,53 +80,32 @@ def get_location_name(latitude: float, longitude: float) -> str:
 
         return "Ort nicht gefunden"
 
+# Zeilen pro Seite in "Alle Messwerte" bzw. pro Stadt und höchstens so viele Tageswerte im Diagramm:
+PAGE_SIZE = 100
+DAILY_LIMIT = 1000
+
+@st.cache_resource
+def get_database() -> WeatherDatabase:
+    """Eine WeatherDatabase für alle Streamlit-Läufe: Rollups und wetter_aktuell bleiben aktuell."""
+    return WeatherDatabase()
+
 def create_database():
     """Erstellt die SQLite-Datenbank und die Tabelle wetterdaten, falls sie noch nicht existiert."""
 
     try:
-        # Verbindung zur Datenbank herstellen (erstellt Datei, falls nicht vorhanden):
-        conn = sqlite3.connect("wetter.db")
-        # Cursor erstellen (ein spezielles Objekt, das SQL-Befehle ausführt):
-        cursor = conn.cursor()
-        # Tabelle erstellen (falls nicht vorhanden), führt ein SQL-Statement aus:
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS wetterdaten (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                city TEXT,
-                latitude REAL,
-                longitude REAL,
-                temperature REAL,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-
-        # Änderungen in der Datenbank speichern:
-        conn.commit()
+        # Öffnet die Verbindung (erstellt Datei und Tabellen, falls nicht vorhanden, siehe weather_db.py):
+        get_database().create_database()
         print("Datenbank und Tabelle wurden erfolgreich erstellt!")
     except sqlite3.DatabaseError as db_error:
         print(f"Fehler beim Erstellen der Datenbank: {db_error}")
-    except sqlite3.OperationalError as op_error:
-        print(f"Betriebsfehler (OperationalError): {op_error}")
     except Exception as e:
         print(f"Unerwarteter Fehler beim Erstellen der Datenbank: {e}")
-    finally:
-        if conn:
-            conn.close()
 
 def save_weather_data_to_db(city, latitude, longitude, temperature):
-    """Speichert Wetterdaten in der SQLite-Datenbank wetter.db.""" 
+    """Speichert Wetterdaten in der SQLite-Datenbank wetter.db (gepuffert, siehe weather_db.py).""" 
 
     try:
-        conn = sqlite3.connect("wetter.db")
-        cursor = conn.cursor()
-
-        # SQL-Befehl zum Einfügen von Daten:
-        cursor.execute("""
-            INSERT INTO wetterdaten (city, latitude, longitude, temperature) 
-            VALUES (?, ?, ?, ?)
-        """, (city, latitude, longitude, temperature))
-
-        conn.commit() 
+        get_database().save_weather_data(city, latitude, longitude, temperature)
 
     except sqlite3.IntegrityError as int_error:
         # Fehler falls Einschränkungen verletzt werden:
@@ -132,58 +116,58 @@ def save_weather_data_to_db(city, latitude, longitude, temperature):
         print(f"Fehler in der Datenbank für {city}: {db_error}")
     except Exception as e:
         print(f"Unerwarteter Fehler beim Speichern von {city}: {e}")
-    finally:
-        if conn:
-            conn.close()
 
-def get_saved_weather():
-    """Ruft alle gespeicherten Wetterdaten aus der Datenbank ab."""
+def get_latest_weather():
+    """Der neueste Messwert pro Standort (aus wetter_aktuell statt aus der ganzen Historie)."""
     try:
-        conn = sqlite3.connect("wetter.db")
-        cursor = conn.cursor()
+        return pd.DataFrame(get_database().get_latest(), columns=weather_db.COLUMNS)
+
+    except sqlite3.DatabaseError as e:
+        print(f"Datenbankfehler: {e}")
+        return pd.DataFrame(columns=weather_db.COLUMNS)
 
-        # Ausführen des SQL-Befehls:
-        cursor.execute("SELECT * FROM wetterdaten ORDER BY timestamp DESC")
-        data = cursor.fetchall()
+def count_saved_weather() -> int:
+    """Anzahl aller gespeicherten Messwerte."""
+    try:
+        return get_database().count_readings()
 
-        # Falls keine Daten vorhanden sind, leere Liste returnen:
-        if not data:
-            print("Keine Wetterdaten in der Datenbank gefunden.")
-            return pd.DataFrame(columns=["id", "city", "latitude", "longitude", "temperature", "timestamp"])
+    except sqlite3.DatabaseError as e:
+        print(f"Datenbankfehler: {e}")
+        return 0
 
-        df = pd.DataFrame(data, columns=["id", "city", "latitude", "longitude", "temperature", "timestamp"])
-        return df  
+def get_saved_weather(limit: int = PAGE_SIZE, offset: int = 0):
+    """Ruft eine Seite der gespeicherten Wetterdaten ab (neueste zuerst)."""
+    try:
+        # Seitenweise laden, die Indizes liefern jede Seite ohne die ganze Tabelle zu lesen:
+        data = get_database().get_readings(limit=limit, offset=offset)
+        return pd.DataFrame(data, columns=weather_db.COLUMNS)
     
     except sqlite3.OperationalError as e:
         print(f"⚠️ Fehler beim Abrufen der Daten: {e}")
-        return pd.DataFrame()
+        return pd.DataFrame(columns=weather_db.COLUMNS)
     
     except sqlite3.DatabaseError as e:
         print(f"Datenbankfehler: {e}")
-        return pd.DataFrame()
-    
-    finally:
-        if conn:
-            conn.close()
+        return pd.DataFrame(columns=weather_db.COLUMNS)
 
-def get_weather_by_city(city_name: str):
-    """Holt Wetterdaten aus der SQLite-Datenbank für eine bestimmte Stadt."""
+def get_daily_weather(limit: int = DAILY_LIMIT):
+    """Vorberechnete Tageswerte (wetter_taeglich) statt Aggregation über die Rohdaten."""
+    try:
+        return pd.DataFrame(get_database().get_rollups("day", limit=limit), columns=weather_db.ROLLUP_COLUMNS)
+
+    except sqlite3.DatabaseError as e:
+        print(f"Datenbankfehler: {e}")
+        return pd.DataFrame(columns=weather_db.ROLLUP_COLUMNS)
+
+def get_weather_by_city(city_name: str, limit: int = PAGE_SIZE):
+    """Holt die neuesten Wetterdaten einer bestimmten Stadt aus der SQLite-Datenbank."""
 
     try:
         if not city_name.strip():
             print("Fehler: Der Stadtname darf nicht leer sein.")
             return []
-        
-        conn = sqlite3.connect("wetter.db")
-        cursor = conn.cursor()
 
-        cursor.execute("""
-            SELECT * FROM wetterdaten 
-            WHERE city = ? 
-            ORDER BY timestamp DESC
-        """, (city_name,))
-
-        data = cursor.fetchall()  
+        data = get_database().get_readings(city=city_name, limit=limit)
 
         if not data:
             print(f"Keine gespeicherten Wetterdaten für {city_name} gefunden.")
@@ -198,25 +182,13 @@ def get_weather_by_city(city_name: str):
     except sqlite3.DatabaseError as e:
         print(f"Datenbankfehler: {e}")
         return []
-    
-    finally:
-        if conn:
-            conn.close()
 
 def delete_weather_data_by_id(entry_id: int):
     """Löscht einen Wetterdateneintrag anhand der ID aus der SQLite-Datenbank."""
 
     try:
-        conn = sqlite3.connect("wetter.db")
-        cursor = conn.cursor()
-
-        cursor.execute("SELECT * FROM wetterdaten WHERE id = ?", (entry_id,))
-        # Falls eine Zeile mit der gesuchten id gefunden wird, enthält data die Werte dieser Zeile als Tupel:
-        data = cursor.fetchone()
-
-        if data:
-            cursor.execute("DELETE FROM wetterdaten WHERE id = ?", (entry_id,))
-            conn.commit()
+        # Löscht über WeatherDatabase, damit Stunden-/Tageswerte und wetter_aktuell mitgeführt werden:
+        if get_database().delete_weather_data(entry_id):
             st.success(f"Wetterdatensatz mit ID {entry_id} wurde gelöscht.")
         else:
             st.warning(f"Keine Daten mit ID {entry_id} gefunden.")
@@ -224,10 +196,6 @@ def delete_weather_data_by_id(entry_id: int):
     except sqlite3.DatabaseError as e:
         st.error(f"Fehler beim Löschen der Daten: {e}")
 
-    finally:
-        if conn:
-            conn.close()
-
 if __name__ == "__main__":
 
     create_database()
@@ -244,24 +212,36 @@ if __name__ == "__main__":
             st.toast(f"Temperatur in {city}: {temperature}°C", icon="✅")
 
     st.header("Gespeicherte Wetterstandorte anzeigen")
-    saved_data = get_saved_weather()
-    if not saved_data.empty:
-        st.dataframe(saved_data)
-        st.map(saved_data[["latitude", "longitude"]])
+    latest = get_latest_weather()
+    if not latest.empty:
+        st.dataframe(latest)
+        st.map(latest[["latitude", "longitude"]])
     else:
         st.warning("Keine Wetterdaten in der Datenbank gefunden.")
 
+    st.header("Alle Messwerte")
+    pages = max(1, -(-count_saved_weather() // PAGE_SIZE))
+    page = st.number_input(f"Seite (von {pages}):", min_value=1, max_value=pages, value=1, step=1)
+    st.dataframe(get_saved_weather(limit=PAGE_SIZE, offset=(page - 1) * PAGE_SIZE))
+
+    st.header("Tagesmittel")
+    daily = get_daily_weather()
+    if not daily.empty:
+        st.line_chart(daily, x="bucket", y="temperature_avg", color="city")
+
     st.header("Wetter für eine Stadt anzeigen")
-    city_selection = st.selectbox("Stadt auswählen", saved_data["city"].unique() if not saved_data.empty else ["Keine Daten verfügbar"])
+    cities = latest["city"].dropna().unique() if not latest.empty else []
+    city_selection = st.selectbox("Stadt auswählen", cities if len(cities) else ["Keine Daten verfügbar"])
+    city_data = []
     if city_selection != "Keine Daten verfügbar":
         city_data = get_weather_by_city(city_selection)
     if city_data:
-        st.dataframe(pd.DataFrame(city_data, columns=["id", "city", "latitude", "longitude", "temperature", "timestamp"]))
+        st.dataframe(pd.DataFrame(city_data, columns=weather_db.COLUMNS))
     else:
         st.warning(f"Keine gespeicherten Wetterdaten für {city_selection} gefunden.")
 
     st.header("Wetterdaten löschen")
-    if not saved_data.empty:
+    if not latest.empty:
         delete_id = st.number_input("ID des zu löschenden Eintrags eingeben:", min_value=1, step=1)
 
         if st.button("Eintrag löschen"):
@@ -1,27 +1,37 @@
 import requests
 import json
-import sqlite3
 import streamlit as st
 import pandas as pd
 
+import http_client
+import open_meteo
+import weather_db
+from geocode_cache import GeocodeCache
+from requests_01 import location_name_from_address
+from weather_db import WeatherDatabase
+
 class WeatherAPI:
     """Klasse zur Interaktion mit der Open-Meteo API"""
 
     BASE_URL = "https://api.open-meteo.com/v1/forecast"
 
-    @staticmethod
-    def get_temperature(latitude: float, longitude: float):
+    def __init__(self, session: requests.Session = None, location_service: "LocationService" = None):
+        # Standard ist die gemeinsame Session aus http_client.py (Keep-Alive, Retries); für Tests austauschbar:
+        self.session = session or http_client.SESSION
+        self.location_service = location_service or LocationService(self.session)
+
+    def get_temperature(self, latitude: float, longitude: float):
         """Holt die aktuelle Temperatur für eine Stadt mit Open-Meteo."""
-        url = f"{WeatherAPI.BASE_URL}?latitude={latitude}&longitude={longitude}&current_weather=true"
+        url = f"{self.BASE_URL}?latitude={latitude}&longitude={longitude}&current_weather=true"
         
         try:
-            response = requests.get(url, timeout=5)
+            response = self.session.get(url, timeout=5)
             response.raise_for_status()
             data = response.json()
 
             if "current_weather" in data:
                 temperature = data["current_weather"]["temperature"]
-                location_name = LocationService.get_location_name(latitude, longitude)
+                location_name = self.location_service.get_location_name(latitude, longitude)
                 return location_name, temperature
 
         except requests.RequestException as e:
@@ -31,87 +41,63 @@ class WeatherAPI:
         
         return None, None
 
+    def get_temperatures(self, coordinates: list) -> list:
+        """Holt die aktuellen Temperaturen für viele (Breitengrad, Längengrad)-Paare.
+
+        Die Koordinaten werden in möglichst wenige Anfragen gebündelt (siehe open_meteo.py);
+        Ergebnis ist eine Liste von Temperaturen (None bei Fehlern) in derselben Reihenfolge.
+        """
+        current_weather = open_meteo.fetch_current_weather(self.session.get, self.BASE_URL, coordinates)
+        return [weather["temperature"] if weather else None for weather in current_weather]
+
 class LocationService:
     """Klasse zur Ermittlung von Ortsnamen anhand von Koordinaten."""
     BASE_URL = "https://nominatim.openstreetmap.org/reverse"
     HEADERS = {"User-Agent": "geo-request"}
+    # Bereits aufgelöste Koordinaten kommen aus dem Cache statt von Nominatim:
+    CACHE = GeocodeCache()
+
+    def __init__(self, session: requests.Session = None, cache: GeocodeCache = None):
+        self.session = session or http_client.SESSION
+        self.cache = cache or LocationService.CACHE
 
-    @staticmethod
-    def get_location_name(latitude: float, longitude: float) -> str:
-        url = f"{LocationService.BASE_URL}?lat={latitude}&lon={longitude}&format=json"
+    def get_location_name(self, latitude: float, longitude: float) -> str:
+        # Fehlschläge (None) landen nicht im Cache, der Platzhalter wird erst hier eingesetzt:
+        return self.cache.get_or_fetch(latitude, longitude, self.fetch_location_name) or "Ort nicht gefunden"
+
+    def fetch_location_name(self, latitude: float, longitude: float) -> str | None:
+        """Ortsname von Nominatim, None bei Netzwerkfehlern oder unbrauchbarer Antwort."""
+        url = f"{self.BASE_URL}?lat={latitude}&lon={longitude}&format=json"
         
         try:
-            response = requests.get(url, headers=LocationService.HEADERS, timeout=5)
+            response = self.session.get(url, headers=self.HEADERS, timeout=5)
             response.raise_for_status()
             data = response.json()
 
-            return data.get("address", {}).get("city", "Ort nicht gefunden")
+            # Stadt, sonst Kleinstadt, Dorf oder Weiler (wie in requests_01.py und collector.py):
+            address = data.get("address") if isinstance(data, dict) else None
+            return location_name_from_address(address) if isinstance(address, dict) else None
 
         except requests.RequestException as e:
             print(f"Netzwerkfehler: {e}")
+        except json.JSONDecodeError:
+            print("Fehler: Ungültige JSON-Antwort")
         
-        return "Ort nicht gefunden"
-
-class WeatherDatabase:
-    """Klasse zur Verwaltung der SQLite-Datenbank für Wetterdaten."""
-    DB_NAME = "wetter.db"
+        return None
 
-    def __init__(self):
-        self._create_database()
-
-    def _create_database(self):
-        try:
-            conn = sqlite3.connect(self.DB_NAME)
-            cursor = conn.cursor()
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS wetterdaten (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    city TEXT,
-                    latitude REAL,
-                    longitude REAL,
-                    temperature REAL,
-                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            conn.commit()
-        finally:
-            conn.close()
-
-    def save_weather_data(self, city, latitude, longitude, temperature):
-        try:
-            conn = sqlite3.connect(self.DB_NAME)
-            cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO wetterdaten (city, latitude, longitude, temperature) 
-                VALUES (?, ?, ?, ?)
-            """, (city, latitude, longitude, temperature))
-            conn.commit()
-        finally:
-            conn.close()
-
-    def get_saved_weather(self):
-        try:
-            conn = sqlite3.connect(self.DB_NAME)
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM wetterdaten ORDER BY timestamp DESC")
-            data = cursor.fetchall()
-            return pd.DataFrame(data, columns=["id", "city", "latitude", "longitude", "temperature", "timestamp"])
-        finally:
-            conn.close()
-
-    def delete_weather_data(self, entry_id):
-        try:
-            conn = sqlite3.connect(self.DB_NAME)
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM wetterdaten WHERE id = ?", (entry_id,))
-            conn.commit()
-        finally:
-            conn.close()
+@st.cache_resource
+def get_database() -> WeatherDatabase:
+    """Eine WeatherDatabase (und damit eine SQLite-Verbindung) für alle Streamlit-Läufe und Sitzungen."""
+    return WeatherDatabase()
 
 class WeatherApp:
     """Klasse zur Steuerung der Wetter-App mit Streamlit."""
+    PAGE_SIZE = 100
+    DAILY_LIMIT = 1000
+
     def __init__(self):
-        self.db = WeatherDatabase()
+        self.db = get_database()
+        self.api = WeatherAPI()
 
     def run(self):
         st.title("Wetter-App mit Open-Meteo API")
@@ -121,21 +107,36 @@ class WeatherApp:
         longitude = st.number_input("Längengrad eingeben:", value=13.41)
         
         if st.button("Wetter abrufen"):
-            city, temperature = WeatherAPI.get_temperature(latitude, longitude)
+            city, temperature = self.api.get_temperature(latitude, longitude)
             if city and temperature is not None:
                 self.db.save_weather_data(city, latitude, longitude, temperature)
                 st.toast(f"Temperatur in {city}: {temperature}°C", icon="✅")
 
         st.header("Gespeicherte Wetterstandorte anzeigen")
-        saved_data = self.db.get_saved_weather()
-        if not saved_data.empty:
-            st.dataframe(saved_data)
-            st.map(saved_data[["latitude", "longitude"]])
+        # Karte aus wetter_aktuell (eine Zeile pro Standort) statt aus der ganzen Historie:
+        latest = pd.DataFrame(self.db.get_latest(), columns=weather_db.COLUMNS)
+        if not latest.empty:
+            st.dataframe(latest)
+            st.map(latest[["latitude", "longitude"]])
         else:
             st.warning("Keine Wetterdaten in der Datenbank gefunden.")
 
+        st.header("Alle Messwerte")
+        # Seitenweise laden, die Indizes liefern jede Seite ohne die ganze Tabelle zu lesen:
+        total = self.db.count_readings()
+        pages = max(1, -(-total // self.PAGE_SIZE))
+        page = st.number_input(f"Seite (von {pages}):", min_value=1, max_value=pages, value=1, step=1)
+        readings = self.db.get_readings(limit=self.PAGE_SIZE, offset=(page - 1) * self.PAGE_SIZE)
+        st.dataframe(pd.DataFrame(readings, columns=weather_db.COLUMNS))
+
+        st.header("Tagesmittel")
+        # Vorberechnete Tageswerte (wetter_taeglich) statt Aggregation über die Rohdaten:
+        daily = pd.DataFrame(self.db.get_rollups("day", limit=self.DAILY_LIMIT), columns=weather_db.ROLLUP_COLUMNS)
+        if not daily.empty:
+            st.line_chart(daily, x="bucket", y="temperature_avg", color="city")
+
         st.header("Wetterdaten löschen")
-        if not saved_data.empty:
+        if not latest.empty:
             delete_id = st.number_input("ID des zu löschenden Eintrags eingeben:", min_value=1, step=1)
             if st.button("Eintrag löschen"):
                 self.db.delete_weather_data(delete_id)
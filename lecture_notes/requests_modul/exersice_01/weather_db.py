@@ -0,0 +1,394 @@
+"""Zugriff auf wetter.db über eine langlebige Verbindung mit gepuffertem Schreiben.
+
+Statt für jede Zeile `sqlite3.connect` + `commit` aufzurufen, hält `WeatherDatabase` eine Verbindung
+offen (WAL-Modus: Leser blockieren den Schreiber nicht) und sammelt neue Messwerte in einem Puffer.
+Der Puffer wird mit `executemany` in einer einzigen Transaktion geschrieben, sobald er `batch_size`
+Zeilen enthält, der älteste Eintrag `max_delay` Sekunden wartet, vor jedem Lesen und bei `close()`.
+
+In derselben Transaktion werden die abgeleiteten Tabellen nachgeführt, damit Dashboards nicht die
+Rohdaten durchsuchen müssen:
+- `wetter_stuendlich` / `wetter_taeglich`: Anzahl, Summe, Minimum und Maximum der Temperatur pro
+  Standort und Stunde bzw. Tag (der Mittelwert wird beim Lesen berechnet),
+- `wetter_aktuell`: der neueste Messwert pro Standort.
+Zeitstempel sind UTC-Strings im Format von CURRENT_TIMESTAMP ("YYYY-MM-DD HH:MM:SS") und lassen
+sich deshalb als Text vergleichen.
+"""
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+WEATHER_DB = os.getenv("WEATHER_DB", "wetter.db")
+WRITE_BATCH_SIZE = int(os.getenv("WEATHER_WRITE_BATCH_SIZE", "500"))
+WRITE_MAX_DELAY = float(os.getenv("WEATHER_WRITE_MAX_DELAY", "1.0"))
+
+COLUMNS = ("id", "city", "latitude", "longitude", "temperature", "timestamp")
+ROLLUP_COLUMNS = ("city", "latitude", "longitude", "bucket", "count", "temperature_avg", "temperature_min", "temperature_max")
+# Periode -> (Tabelle, Länge des Zeitstempel-Präfixes, Suffix); der Bucket ist der Beginn des Zeitraums:
+ROLLUPS = {
+    "hour": ("wetter_stuendlich", 13, ":00:00"),
+    "day": ("wetter_taeglich", 10, ""),
+}
+
+# Die SQL-Texte sind Konstanten: sqlite3 hält pro Verbindung einen Cache vorbereiteter Statements
+# (Schlüssel ist der SQL-Text), jedes Statement wird also nur einmal kompiliert.
+CREATE_TABLE = """
+    CREATE TABLE IF NOT EXISTS wetterdaten (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        city TEXT,
+        latitude REAL,
+        longitude REAL,
+        temperature REAL,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_wetterdaten_city_timestamp ON wetterdaten (city, timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_wetterdaten_location_timestamp ON wetterdaten (latitude, longitude, timestamp)",
+    # Für "neueste zuerst" ohne Filter (LIMIT/OFFSET ohne Sortieren der ganzen Tabelle):
+    "CREATE INDEX IF NOT EXISTS idx_wetterdaten_timestamp ON wetterdaten (timestamp)",
+)
+CREATE_ROLLUP = """
+    CREATE TABLE IF NOT EXISTS {table} (
+        city TEXT,
+        latitude REAL,
+        longitude REAL,
+        bucket TEXT,
+        count INTEGER,
+        temperature_sum REAL,
+        temperature_min REAL,
+        temperature_max REAL,
+        PRIMARY KEY (latitude, longitude, bucket)
+    )
+"""
+CREATE_ROLLUP_INDEX = "CREATE INDEX IF NOT EXISTS idx_{table}_city_bucket ON {table} (city, bucket)"
+CREATE_LATEST = """
+    CREATE TABLE IF NOT EXISTS wetter_aktuell (
+        id INTEGER,
+        city TEXT,
+        latitude REAL,
+        longitude REAL,
+        temperature REAL,
+        timestamp DATETIME,
+        PRIMARY KEY (latitude, longitude)
+    )
+"""
+
+INSERT = "INSERT INTO wetterdaten (city, latitude, longitude, temperature, timestamp) VALUES (?, ?, ?, ?, ?)"
+SELECT_ALL = "SELECT * FROM wetterdaten ORDER BY timestamp DESC"
+SELECT_BY_CITY = "SELECT * FROM wetterdaten WHERE city = ? ORDER BY timestamp DESC"
+SELECT_BY_ID = "SELECT latitude, longitude, timestamp FROM wetterdaten WHERE id = ?"
+DELETE_BY_ID = "DELETE FROM wetterdaten WHERE id = ?"
+UPSERT_ROLLUP = """
+    INSERT INTO {table} (city, latitude, longitude, bucket, count, temperature_sum, temperature_min, temperature_max)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (latitude, longitude, bucket) DO UPDATE SET
+        city = excluded.city,
+        count = count + excluded.count,
+        temperature_sum = temperature_sum + excluded.temperature_sum,
+        temperature_min = MIN(temperature_min, excluded.temperature_min),
+        temperature_max = MAX(temperature_max, excluded.temperature_max)
+"""
+# Rollups aus den Rohdaten neu berechnen (alle oder, mit zusätzlicher Bedingung, einzelne Buckets):
+REBUILD_ROLLUP = """
+    INSERT OR REPLACE INTO {table} (city, latitude, longitude, bucket, count, temperature_sum, temperature_min, temperature_max)
+    SELECT MAX(city), latitude, longitude, substr(timestamp, 1, {length}) || '{suffix}',
+           COUNT(*), SUM(temperature), MIN(temperature), MAX(temperature)
+    FROM wetterdaten
+    WHERE temperature IS NOT NULL{where}
+    GROUP BY latitude, longitude, substr(timestamp, 1, {length})
+"""
+UPSERT_LATEST = """
+    INSERT INTO wetter_aktuell (id, city, latitude, longitude, temperature, timestamp)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (latitude, longitude) DO UPDATE SET
+        id = excluded.id,
+        city = excluded.city,
+        temperature = excluded.temperature,
+        timestamp = excluded.timestamp
+    WHERE excluded.timestamp >= wetter_aktuell.timestamp
+"""
+# Neuester Messwert pro Standort aus allen Rohdaten (bei gleichem Zeitstempel gewinnt die höhere id):
+REBUILD_LATEST = """
+    INSERT INTO wetter_aktuell (id, city, latitude, longitude, temperature, timestamp)
+    SELECT id, city, latitude, longitude, temperature, timestamp
+    FROM (
+        SELECT *, ROW_NUMBER() OVER (PARTITION BY latitude, longitude ORDER BY timestamp DESC, id DESC) AS position
+        FROM wetterdaten
+    )
+    WHERE position = 1
+"""
+REFRESH_LATEST = """
+    INSERT INTO wetter_aktuell (id, city, latitude, longitude, temperature, timestamp)
+    SELECT id, city, latitude, longitude, temperature, timestamp
+    FROM wetterdaten
+    WHERE latitude = ? AND longitude = ?
+    ORDER BY timestamp DESC, id DESC
+    LIMIT 1
+"""
+
+
+def utc_timestamp() -> str:
+    """Aktuelle Zeit im Format von CURRENT_TIMESTAMP (UTC)."""
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+
+
+def to_timestamp(value) -> str:
+    """datetime (naiv = UTC) oder String in das Zeitstempel-Format der Tabelle."""
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    return value
+
+
+def connect(path: str = WEATHER_DB) -> sqlite3.Connection:
+    """Öffnet wetter.db im WAL-Modus und legt Tabellen und Indizes an, falls nötig."""
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    # Im WAL-Modus reicht NORMAL: ein Absturz kann die letzte Transaktion kosten, aber nie die Datei beschädigen.
+    conn.execute("PRAGMA synchronous=NORMAL")
+    # Ältere Datenbanken haben noch keine abgeleiteten Tabellen; diese dann einmal aus den Rohdaten füllen:
+    migrate = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'wetter_aktuell'").fetchone() is None
+    conn.execute(CREATE_TABLE)
+    for statement in INDEXES:
+        conn.execute(statement)
+    for table, _, _ in ROLLUPS.values():
+        conn.execute(CREATE_ROLLUP.format(table=table))
+        conn.execute(CREATE_ROLLUP_INDEX.format(table=table))
+    conn.execute(CREATE_LATEST)
+    if migrate:
+        rebuild_aggregates(conn)
+    conn.commit()
+    return conn
+
+
+def rebuild_aggregates(conn: sqlite3.Connection):
+    """Berechnet Rollups und wetter_aktuell komplett aus wetterdaten (ohne commit)."""
+    for table, length, suffix in ROLLUPS.values():
+        conn.execute(f"DELETE FROM {table}")
+        conn.execute(REBUILD_ROLLUP.format(table=table, length=length, suffix=suffix, where=""))
+    conn.execute("DELETE FROM wetter_aktuell")
+    conn.execute(REBUILD_LATEST)
+
+
+def update_aggregates(conn: sqlite3.Connection, rows: list, first_id: int):
+    """Führt die abgeleiteten Tabellen für neu eingefügte Zeilen nach (ohne commit).
+
+    `rows` sind die eingefügten (city, latitude, longitude, temperature, timestamp)-Tupel,
+    `first_id` die id der ersten davon (die übrigen folgen lückenlos).
+    """
+    for table, length, suffix in ROLLUPS.values():
+        # Erst im Speicher pro (Standort, Bucket) zusammenfassen, dann ein Upsert pro Bucket:
+        buckets = {}
+        for city, latitude, longitude, temperature, timestamp in rows:
+            if temperature is None:
+                continue
+            key = (latitude, longitude, timestamp[:length] + suffix)
+            bucket = buckets.get(key)
+            if bucket is None:
+                buckets[key] = [city, 1, temperature, temperature, temperature]
+            else:
+                bucket[0] = city
+                bucket[1] += 1
+                bucket[2] += temperature
+                bucket[3] = min(bucket[3], temperature)
+                bucket[4] = max(bucket[4], temperature)
+        conn.executemany(UPSERT_ROLLUP.format(table=table), [
+            (city, latitude, longitude, bucket, count, total, minimum, maximum)
+            for (latitude, longitude, bucket), (city, count, total, minimum, maximum) in buckets.items()
+        ])
+
+    latest = {}
+    for row_id, (city, latitude, longitude, temperature, timestamp) in enumerate(rows, first_id):
+        current = latest.get((latitude, longitude))
+        # Spätere Zeilen haben die höhere id und gewinnen bei gleichem Zeitstempel:
+        if current is None or timestamp >= current[5]:
+            latest[(latitude, longitude)] = (row_id, city, latitude, longitude, temperature, timestamp)
+    conn.executemany(UPSERT_LATEST, latest.values())
+
+
+def refresh_aggregates(conn: sqlite3.Connection, latitude: float, longitude: float, timestamp: str):
+    """Berechnet nach dem Löschen einer Zeile ihre Buckets und wetter_aktuell für den Standort neu (ohne commit)."""
+    for table, length, suffix in ROLLUPS.values():
+        prefix = timestamp[:length]
+        conn.execute(f"DELETE FROM {table} WHERE latitude = ? AND longitude = ? AND bucket = ?",
+                     (latitude, longitude, prefix + suffix))
+        # Bereichsabfrage über den Präfix, damit der Index (latitude, longitude, timestamp) greift
+        # ("\x7f" ist größer als jedes Zeichen eines Zeitstempels):
+        where = " AND latitude = ? AND longitude = ? AND timestamp >= ? AND timestamp < ?"
+        conn.execute(REBUILD_ROLLUP.format(table=table, length=length, suffix=suffix, where=where),
+                     (latitude, longitude, prefix, prefix + "\x7f"))
+    conn.execute("DELETE FROM wetter_aktuell WHERE latitude = ? AND longitude = ?", (latitude, longitude))
+    conn.execute(REFRESH_LATEST, (latitude, longitude))
+
+
+def _filters(city=None, latitude=None, longitude=None, start=None, end=None, column="timestamp") -> tuple[str, list]:
+    """WHERE-Klausel und Parameter für die optionalen Filter (start inklusive, end exklusiv)."""
+    conditions, params = [], []
+    for condition, value in (
+        ("city = ?", city),
+        ("latitude = ?", latitude),
+        ("longitude = ?", longitude),
+        (f"{column} >= ?", start),
+        (f"{column} < ?", end),
+    ):
+        if value is not None:
+            conditions.append(condition)
+            params.append(to_timestamp(value))
+    return (" WHERE " + " AND ".join(conditions) if conditions else ""), params
+
+
+class WeatherDatabase:
+    """Wetterdaten in SQLite, eine Verbindung pro Instanz, Schreiben gepuffert (threadsicher)."""
+
+    def __init__(self, path: str = WEATHER_DB, batch_size: int = WRITE_BATCH_SIZE,
+                 max_delay: float = WRITE_MAX_DELAY):
+        self.path = path
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        # Die Datei wird erst beim ersten Zugriff angelegt, nicht schon beim Import:
+        self._conn = None
+        self._buffer = []
+        self._buffered_since = 0.0
+        self.rows_written = 0
+        self.flushes = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def create_database(self):
+        with self._lock:
+            self._connection()
+
+    def save_weather_data(self, city, latitude, longitude, temperature, timestamp=None):
+        """Puffert einen Messwert; ohne `timestamp` gilt die aktuelle Zeit, nicht erst die beim Schreiben."""
+        self.save_many([(city, latitude, longitude, temperature)], timestamp)
+
+    def save_many(self, readings, timestamp=None):
+        """Puffert viele (city, latitude, longitude, temperature[, timestamp])-Tupel auf einmal.
+
+        Tupel ohne eigenen Zeitstempel bekommen `timestamp` bzw. die aktuelle Zeit.
+        """
+        timestamp = to_timestamp(timestamp) if timestamp is not None else utc_timestamp()
+        with self._lock:
+            if not self._buffer:
+                self._buffered_since = time.monotonic()
+            self._buffer.extend(
+                (*reading[:4], to_timestamp(reading[4])) if len(reading) > 4 else (*reading, timestamp)
+                for reading in readings
+            )
+            if len(self._buffer) >= self.batch_size or time.monotonic() - self._buffered_since >= self.max_delay:
+                self._flush()
+
+    def flush(self) -> int:
+        """Schreibt alle gepufferten Messwerte in einer Transaktion und gibt ihre Anzahl zurück."""
+        with self._lock:
+            return self._flush()
+
+    def get_saved_weather(self) -> list:
+        """Alle Messwerte, neueste zuerst (für große Datenbanken besser `get_readings` mit limit)."""
+        return self._query(SELECT_ALL)
+
+    def get_weather_by_city(self, city_name: str) -> list:
+        return self._query(SELECT_BY_CITY, (city_name,))
+
+    def get_readings(self, city=None, latitude=None, longitude=None, start=None, end=None,
+                     limit: int | None = 100, offset: int = 0) -> list:
+        """Messwerte im Zeitraum [start, end), neueste zuerst, seitenweise über limit/offset.
+
+        Alle Filter sind optional; start/end sind Zeitstempel-Strings oder datetime-Objekte.
+        """
+        where, params = _filters(city, latitude, longitude, start, end)
+        return self._query(f"SELECT * FROM wetterdaten{where} ORDER BY timestamp DESC LIMIT ? OFFSET ?",
+                           (*params, -1 if limit is None else limit, offset))
+
+    def count_readings(self, city=None, latitude=None, longitude=None, start=None, end=None) -> int:
+        where, params = _filters(city, latitude, longitude, start, end)
+        return self._query(f"SELECT COUNT(*) FROM wetterdaten{where}", params)[0][0]
+
+    def get_latest(self, limit: int | None = None, offset: int = 0) -> list:
+        """Der neueste Messwert pro Standort (aus wetter_aktuell), neueste zuerst."""
+        return self._query(
+            "SELECT id, city, latitude, longitude, temperature, timestamp FROM wetter_aktuell "
+            "ORDER BY timestamp DESC LIMIT ? OFFSET ?",
+            (-1 if limit is None else limit, offset),
+        )
+
+    def get_rollups(self, period: str = "day", city=None, latitude=None, longitude=None, start=None, end=None,
+                    limit: int | None = None, offset: int = 0) -> list:
+        """Vorberechnete Stunden- (`period="hour"`) oder Tageswerte, Spalten wie ROLLUP_COLUMNS, neueste zuerst.
+
+        start/end beziehen sich auf den Beginn des Buckets.
+        """
+        if period not in ROLLUPS:
+            raise ValueError(f"Unbekannte Periode: {period} (erlaubt: {', '.join(ROLLUPS)})")
+        table = ROLLUPS[period][0]
+        where, params = _filters(city, latitude, longitude, start, end, column="bucket")
+        return self._query(
+            f"SELECT city, latitude, longitude, bucket, count, temperature_sum / count, temperature_min, temperature_max "
+            f"FROM {table}{where} ORDER BY bucket DESC LIMIT ? OFFSET ?",
+            (*params, -1 if limit is None else limit, offset),
+        )
+
+    def delete_weather_data(self, entry_id) -> bool:
+        """Löscht einen Messwert samt Rollups/wetter_aktuell; False, wenn es die id nicht gibt."""
+        with self._lock:
+            self._flush()
+            conn = self._connection()
+            with conn:
+                row = conn.execute(SELECT_BY_ID, (entry_id,)).fetchone()
+                if row is not None:
+                    conn.execute(DELETE_BY_ID, (entry_id,))
+                    refresh_aggregates(conn, *row)
+            return row is not None
+
+    def rebuild_aggregates(self):
+        """Rollups und wetter_aktuell komplett neu berechnen (z.B. nach Änderungen an wetterdaten von außen)."""
+        with self._lock:
+            self._flush()
+            conn = self._connection()
+            with conn:
+                rebuild_aggregates(conn)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._flush()
+                self._conn.close()
+                self._conn = None
+
+    def _flush(self) -> int:
+        if not self._buffer:
+            return 0
+        rows, self._buffer = self._buffer, []
+        conn = self._connection()
+        try:
+            # `with conn` schreibt alles in einer Transaktion (commit bzw. rollback bei Fehlern):
+            with conn:
+                conn.executemany(INSERT, rows)
+                # Die Transaktion hält die Schreibsperre, die ids des Bündels sind also lückenlos:
+                last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+                update_aggregates(conn, rows, last_id - len(rows) + 1)
+        except sqlite3.Error:
+            # Nichts verlieren: die Zeilen bleiben für den nächsten Versuch im Puffer.
+            self._buffer[:0] = rows
+            raise
+        self.rows_written += len(rows)
+        self.flushes += 1
+        return len(rows)
+
+    def _query(self, sql: str, params=()) -> list:
+        with self._lock:
+            self._flush()
+            return self._connection().execute(sql, params).fetchall()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = connect(self.path)
+        return self._conn